@@ -1,12 +1,14 @@
 import streamlit as st
-from scholar_search import run_scholar_search
-from search_api import search_openalex,  search_arxiv, search_crossref,enrich_with_firecrawl, summarize_filtered_papers, filter_irrelevant_papers
+from pipeline import stream_pipeline
+from scholar_search import get_scholar_browsers
 import pandas as pd
 import json
 import os
 import glob
+from itertools import islice
 from dotenv import load_dotenv
-from utils import filter_duplicates, save_results_to_json, save_results_to_database,get_latest_json
+from search_index import get_search_index
+from utils import save_results_to_json, save_results_to_database, iter_results, export_pretty_json
 
 
 # ===================== PAGE CONFIG =====================
@@ -17,6 +19,8 @@ RESULTS_DIR = "results"
 DATABASE_DIR = "database"
 DATABASE_FILE = "papers_db.json"
 ENV_PATH = ".env"
+PREVIEW_ROWS = 500  # Số dòng tối đa hiển thị, tránh nạp cả file lớn vào bộ nhớ
+SEARCH_LIMIT = 50
 
 if not os.path.exists(RESULTS_DIR):
     os.makedirs(RESULTS_DIR)
@@ -27,10 +31,24 @@ if not os.path.exists(ENV_PATH):
 load_dotenv(ENV_PATH)
 
 
+# Chrome headless được giữ ấm cho cả tiến trình Streamlit, mọi phiên dùng chung
+@st.cache_resource
+def warm_scholar_browsers():
+    browsers = get_scholar_browsers()
+    try:
+        browsers.warm(1)
+    except Exception as e:
+        print(f"⚠️ Không khởi động trước được trình duyệt: {e}")
+    return browsers
+
+
+warm_scholar_browsers()
+
 # ===================== TABS =====================
-tab1, tab2 = st.tabs([
+tab1, tab2, tab3 = st.tabs([
     "🌐 All APIs + Scholar",
-    "📁 Danh sách kết quả"
+    "📁 Danh sách kết quả",
+    "🔎 Tìm kiếm bài báo"
 ])
 
 # ===================== TAB 1 =====================
@@ -46,34 +64,11 @@ with tab1:
             st.warning("⚠️ Vui lòng nhập từ khóa tìm kiếm!")
         else:
             with st.spinner("Đang tìm kiếm trên tất cả các API..."):
-                # 1. Gọi các API
-                openalex_res = search_openalex(query=keyword_tab1, rows=max_results_tab1)
-                arxiv_res = search_arxiv(query=keyword_tab1, rows=max_results_tab1)
-                crossref_res = search_crossref(query=keyword_tab1, rows=max_results_tab1)
-
-                # Google Scholar
-                scholar_data = run_scholar_search(keyword_tab1, max_results_tab1)
-
-                # 2. Hợp nhất kết quả
-                merged_results = []
-                for res in [openalex_res, arxiv_res, crossref_res, scholar_data]:
-                    merged_results.extend(res)
-
-                # 3. Lọc trùng 
-                st.info("⏳ Đang lọc bài báo trùng...")
-                unique_results = filter_duplicates(merged_results)
-
-                # 4. Crawl abstract bổ sung bằng Firecrawl
-                st.info("⏳ Đang bổ sung abstract...")
-                enriched_results = enrich_with_firecrawl(unique_results)
-
-                # 5. Lọc bài không liên quan
-                st.info("⏳ Đang lọc bài không liên quan...")
-                filtered_results = filter_irrelevant_papers(enriched_results)
-
-                # 6. Tóm tắt abstract
-                st.info("⏳ Đang tóm tắt abstract...")
-                summarized_results = summarize_filtered_papers(filtered_results)
+                # 1-6. Tìm kiếm -> lọc trùng -> bổ sung abstract -> lọc liên quan -> tóm tắt (streaming)
+                summarized_results, pipeline_stats = stream_pipeline(keyword_tab1, max_results_tab1)
+                st.dataframe(pd.DataFrame.from_dict(pipeline_stats["sources"], orient="index"))
+                st.dataframe(pd.DataFrame.from_dict(pipeline_stats["stages"], orient="index"))
+                st.caption(f"⏱️ Pipeline xong sau {pipeline_stats['seconds']}s")
 
                 # 7. Lưu kết quả
                 saved_file = save_results_to_json(
@@ -87,27 +82,25 @@ with tab1:
                 st.success(f"✅ Đã lưu kết quả enriched vào: {saved_file}")
 
                 # 8. Hiển thị kết quả
-                latest_file = get_latest_json()
-                if latest_file:
+                if saved_file:
                     try:
-                        with open(latest_file, "r", encoding="utf-8") as f:
-                            today_results = json.load(f)
-                        df = pd.DataFrame(today_results)
+                        df = pd.DataFrame(islice(iter_results(saved_file), PREVIEW_ROWS))
                         st.subheader("📄 Kết quả bài báo hôm nay")
                         st.dataframe(df)
                     except Exception as e:
                         st.error(f"❌ Lỗi khi đọc file JSON: {e}")
+
+                    # 9. Nút tải file kết quả (JSON Lines)
+                    with open(saved_file, "rb") as f:
+                        st.download_button(
+                            label="📥 Tải kết quả JSONL",
+                            data=f,
+                            file_name=os.path.basename(saved_file),
+                            mime="application/jsonl"
+                        )
                 else:
                     st.info("ℹ️ Chưa có file kết quả hôm nay.")
 
-                # 9. Nút tải file JSON
-                st.download_button(
-                    label="📥 Tải kết quả JSON",
-                    data=json.dumps(today_results, indent=2, ensure_ascii=False),
-                    file_name=os.path.basename(saved_file),
-                    mime="application/json"
-                )
-
 
 
 
@@ -115,7 +108,10 @@ with tab1:
 with tab2:
     st.subheader("📂 Danh sách tất cả file kết quả đã lưu")
 
-    files = sorted(glob.glob(os.path.join(RESULTS_DIR, "*.json")), key=os.path.getmtime, reverse=True)
+    files = sorted(
+        glob.glob(os.path.join(RESULTS_DIR, "*.json")) + glob.glob(os.path.join(RESULTS_DIR, "*.jsonl")),
+        key=os.path.getmtime, reverse=True
+    )
 
     if not files:
         st.info("⚠️ Chưa có file kết quả nào được lưu.")
@@ -128,9 +124,52 @@ with tab2:
             with open(file_path, "rb") as f:
                 st.download_button(
                     label=f"📥 Tải {filename}",
-                    data=f.read(),
+                    data=f,
                     file_name=filename,
-                    mime="application/json",
+                    mime="application/jsonl" if filename.endswith(".jsonl") else "application/json",
                     key=filename
                 )
+
+            # Xuất JSON dạng mảng (indent) khi cần, ghi ra file từng bài một
+            if filename.endswith(".jsonl") and st.button(f"🧾 Xuất {filename} sang JSON", key=f"export_{filename}"):
+                export_file = export_pretty_json(file_path)
+                with open(export_file, "rb") as f:
+                    st.download_button(
+                        label=f"📥 Tải {os.path.basename(export_file)}",
+                        data=f,
+                        file_name=os.path.basename(export_file),
+                        mime="application/json",
+                        key=f"download_export_{filename}"
+                    )
+            st.markdown("---")
+
+
+# ===================== TAB 3 =====================
+with tab3:
+    st.subheader("🔎 Tìm kiếm trong tất cả bài báo đã thu thập")
+
+    search_index = get_search_index()
+    added = search_index.sync_dir(RESULTS_DIR)  # chỉ index file mới / phần mới append
+    if added:
+        st.caption(f"Đã index thêm {added} bài báo.")
+
+    query = st.text_input("Từ khóa (title, abstract, summary, tác giả):", key="search_query")
+    source = st.selectbox(
+        "Nguồn",
+        ["Tất cả", "OpenAlex", "arXiv", "Crossref", "Google Scholar"],
+        key="search_source"
+    )
+
+    if query.strip():
+        hits, elapsed_ms = search_index.search(
+            query, limit=SEARCH_LIMIT, source=None if source == "Tất cả" else source
+        )
+        st.caption(f"{len(hits)} kết quả trong {elapsed_ms:.1f} ms (chỉ mục {len(search_index)} bài)")
+        for hit in hits:
+            st.markdown(f"**[{hit['title']}]({hit['link']})**")
+            st.caption(f"{hit['authors']} · {hit['source']} · {hit['pub_date']} · {hit['file']}")
+            st.markdown(hit["snippet"])
+            if hit["summary"]:
+                with st.expander("Tóm tắt"):
+                    st.write(hit["summary"])
             st.markdown("---")
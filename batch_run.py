@@ -0,0 +1,90 @@
+from search_api import (
+    enrich_with_firecrawl, summarize_filtered_papers, classify_papers_by_topic,
+    FIRECRAWL_CONCURRENCY, RELEVANCE_BATCH_SIZE, SUMMARY_BATCH_SIZE,
+)
+from pipeline import StagedPipeline, run_multi_searches
+from dotenv import load_dotenv
+from utils import filter_duplicates, save_results_to_json, save_results_to_database
+from watermarks import Watermarks
+import json
+import os
+import sys
+
+
+RESULTS_DIR = "results"
+DATABASE_DIR = "database"
+ENV_PATH = ".env"
+TOPICS_FILE = sys.argv[1] if len(sys.argv) > 1 else "topics.json"
+
+if not os.path.exists(RESULTS_DIR):
+    os.makedirs(RESULTS_DIR)
+
+if not os.path.exists(ENV_PATH):
+    open(ENV_PATH, "a").close()
+
+load_dotenv(ENV_PATH)
+
+# Cấu hình: {"max_results": 30, "topics": [{"name", "query", "keywords"}]}
+with open(TOPICS_FILE, "r", encoding="utf-8") as f:
+    config = json.load(f)
+topics = config["topics"]
+max_results = config.get("max_results", 30)
+queries = list(dict.fromkeys(topic.get("query") or topic["name"] for topic in topics))
+
+pipeline = StagedPipeline(f"batch_{os.path.splitext(os.path.basename(TOPICS_FILE))[0]}")
+watermarks = Watermarks(DATABASE_DIR)
+
+# 1-2. Tìm kiếm đồng thời mọi topic trên mọi nguồn, hợp nhất trùng giữa nguồn và giữa topic
+merged_results = pipeline.run_once("search", lambda: run_multi_searches(queries, max_results,
+                                                                      watermarks=watermarks)[0])
+
+# 3. Lọc trùng với database (một lần cho mọi topic)
+print("⏳ Đang lọc bài báo trùng...")
+unique_results = pipeline.run_stage("dedup", merged_results, filter_duplicates, kind="filter",
+                                    chunk_size=len(merged_results))
+
+# 4. Crawl abstract bổ sung bằng Firecrawl
+print("⏳ Đang bổ sung abstract...")
+enriched_results = pipeline.run_stage("enrich", unique_results, enrich_with_firecrawl,
+                                      chunk_size=FIRECRAWL_CONCURRENCY * 5)
+
+
+# 5. Phân loại mỗi bài theo tất cả topic trong cùng một lần gọi Gemini
+def classify(papers):
+    for paper, matched in zip(papers, classify_papers_by_topic(papers, topics)):
+        paper["topics"] = matched
+    return papers
+
+
+print("⏳ Đang phân loại theo topic...")
+classified_results = pipeline.run_stage("classify", enriched_results, classify, chunk_size=RELEVANCE_BATCH_SIZE)
+relevant_results = [paper for paper in classified_results if paper.get("topics")]
+
+# 6. Tóm tắt abstract (mỗi bài một lần dù thuộc nhiều topic)
+print("⏳ Đang tóm tắt abstract...")
+summarized_results = pipeline.run_stage("summary", relevant_results, summarize_filtered_papers,
+                                        chunk_size=SUMMARY_BATCH_SIZE)
+
+
+# 7. Lưu file kết quả riêng cho từng topic
+def save(papers):
+    saved = {}
+    for topic in topics:
+        topic_papers = [paper for paper in papers if topic["name"] in paper.get("topics", [])]
+        result_file = save_results_to_json(
+            topic_papers,
+            output_dir=RESULTS_DIR,
+            prefix=f"allapi_scholar_{topic['name'].replace(' ', '_')}"
+        )
+        if result_file:
+            save_results_to_database(result_file)
+        saved[topic["name"]] = result_file
+    return saved
+
+
+saved_files = pipeline.run_once("save", lambda: save(summarized_results))
+watermarks.commit()
+pipeline.finish()
+
+for name, result_file in saved_files.items():
+    print(f"✅ {name}: {result_file}")
@@ -0,0 +1,201 @@
+"""
+Microbenchmark chuẩn hóa kết quả: parser cũ (dict + .get lồng nhau, sort list (pos, word))
+so với paper_record (mảng vị trí cấp phát sẵn): dict mà iter_* yield (record_dict) và
+bản ghi gọn Paper __slots__ dựng từ cùng tuple giá trị.
+
+Chạy từ thư mục gốc repo:
+    python benchmarks/bench_normalize.py [số bản ghi mỗi nguồn]
+"""
+import os
+import random
+import sys
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from paper_record import (
+    Paper, arxiv_values, crossref_values, decode_openalex_abstract, openalex_values, record_dict,
+)
+
+N_RECORDS = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+REPEAT = 7
+ABSTRACT_WORDS = 180
+VOCABULARY = [f"word{i}" for i in range(2000)]
+ARXIV_NS = {"arxiv": "http://www.w3.org/2005/Atom"}
+
+
+# ========================
+# Parser cũ (bản trước khi có paper_record), giữ lại để so sánh
+# ========================
+def legacy_decode_openalex_abstract(inverted_index):
+    if not inverted_index:
+        return "Not Available"
+    words = sorted([(pos, word) for word, positions in inverted_index.items() for pos in positions])
+    return " ".join(word for pos, word in words)
+
+
+def legacy_parse_openalex_item(item):
+    title = item.get("title", "No title")
+    abstract = legacy_decode_openalex_abstract(item.get("abstract_inverted_index"))
+    if abstract and isinstance(abstract, str):
+        abstract = abstract.replace("\n", " ").strip()
+    authors = [a["author"]["display_name"] for a in item.get("authorships", []) if "author" in a]
+    authors_str = ", ".join(authors) if authors else "Not Available"
+    link = item.get("primary_location", {}).get("landing_page_url", "Not Available")
+    citations = item.get("cited_by_count", 0)
+    status = item.get("open_access", {}).get("status", "Not Available")
+    return {
+        "source": "OpenAlex", "title": title, "abstract": abstract, "authors": authors_str,
+        "link": link, "citations": citations, "status": status,
+        "pub_date": item.get("publication_date", "Not Available")
+    }
+
+
+def legacy_parse_arxiv_entry(entry):
+    ns = ARXIV_NS
+    title = entry.find("arxiv:title", ns).text.strip()
+    abstract = entry.find("arxiv:summary", ns).text.strip()
+    link = entry.find("arxiv:id", ns).text.strip()
+    authors = [a.find("arxiv:name", ns).text for a in entry.findall("arxiv:author", ns)]
+    authors_str = ", ".join(authors) if authors else "Not Available"
+    pub_date = entry.find("arxiv:published", ns).text[:10]
+    return {
+        "source": "arXiv", "title": title, "abstract": abstract, "authors": authors_str,
+        "link": link, "citations": 0, "status": "Open Access", "pub_date": pub_date
+    }
+
+
+def legacy_parse_crossref_item(item):
+    date_parts = item.get("issued", {}).get("date-parts", [[None]])
+    pub_date = "-".join(str(p) for p in date_parts[0] if p is not None)
+    title = item.get("title", ["No title"])[0]
+    abstract = item.get("abstract", "Not Available")
+    if abstract and isinstance(abstract, str):
+        abstract = abstract.replace("\n", " ").strip()
+    authors = []
+    for a in item.get("author", []):
+        full_name = f"{a.get('given', '')} {a.get('family', '')}".strip()
+        if full_name:
+            authors.append(full_name)
+    authors_str = ", ".join(authors) if authors else "Not Available"
+    doi = item.get("DOI", "")
+    link = f"https://doi.org/{doi}" if doi else "Not Available"
+    return {
+        "source": "Crossref", "title": title, "abstract": abstract, "authors": authors_str,
+        "link": link, "citations": item.get("is-referenced-by-count", 0),
+        "status": item.get("publisher", "Not Available"), "pub_date": pub_date
+    }
+
+
+# ========================
+# Dữ liệu giả lập theo đúng schema của từng API
+# ========================
+def make_openalex_items(n, rng):
+    items = []
+    for i in range(n):
+        inverted = {}
+        for pos in range(ABSTRACT_WORDS):
+            inverted.setdefault(rng.choice(VOCABULARY), []).append(pos)
+        items.append({
+            "title": f"Paper {i} on ultrasonic testing",
+            "abstract_inverted_index": inverted,
+            "authorships": [{"author": {"display_name": f"Author {i}-{k}"}} for k in range(4)],
+            "primary_location": {"landing_page_url": f"https://example.org/{i}"},
+            "cited_by_count": i % 50,
+            "open_access": {"status": "gold"},
+            "publication_date": "2025-01-01"
+        })
+    return items
+
+
+def make_arxiv_entries(n, rng):
+    entries = []
+    for i in range(n):
+        authors = "".join(f"<author><name>Author {i}-{k}</name></author>" for k in range(4))
+        abstract = " ".join(rng.choice(VOCABULARY) for _ in range(ABSTRACT_WORDS))
+        entries.append(
+            f"<entry><id>http://arxiv.org/abs/2501.{i:05d}v1</id><published>2025-01-01T00:00:00Z</published>"
+            f"<title>\n  Paper {i} on eddy current\n</title><summary>\n{abstract}\n</summary>{authors}</entry>"
+        )
+    feed = f'<feed xmlns="http://www.w3.org/2005/Atom">{"".join(entries)}</feed>'
+    return ET.fromstring(feed).findall("arxiv:entry", ARXIV_NS)
+
+
+def make_crossref_items(n, rng):
+    return [{
+        "title": [f"Paper {i} on radiography"],
+        "abstract": "<jats:p>" + " ".join(rng.choice(VOCABULARY) for _ in range(ABSTRACT_WORDS)) + "\n</jats:p>",
+        "author": [{"given": f"Given{k}", "family": f"Family{i}"} for k in range(4)],
+        "DOI": f"10.1000/bench.{i}",
+        "is-referenced-by-count": i % 50,
+        "publisher": "Elsevier BV",
+        "issued": {"date-parts": [[2025, 1, 1]]}
+    } for i in range(n)]
+
+
+# ========================
+# Đo
+# ========================
+def best_times(fns, records):
+    """Lần nhanh nhất của từng hàm; các hàm chạy xen kẽ nhau để nhiễu máy chia đều."""
+    best = [float("inf")] * len(fns)
+    for _ in range(REPEAT):
+        for i, fn in enumerate(fns):
+            start = time.perf_counter()
+            for record in records:
+                fn(record)
+            best[i] = min(best[i], time.perf_counter() - start)
+    return best
+
+
+def retained_bytes(build):
+    tracemalloc.start()
+    kept = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return size
+
+
+def bench_source(name, records, legacy, values):
+    for record in records[:500]:
+        expected = legacy(record)
+        assert record_dict(values(record)) == expected, f"{name}: dict khác parser cũ"
+        assert Paper(*values(record)).to_dict() == expected, f"{name}: Paper khác parser cũ"
+    # Cả ba cùng gọi qua một lambda để chi phí gọi hàm như nhau
+    old, as_dict, as_paper = best_times(
+        [lambda r: legacy(r), lambda r: record_dict(values(r)), lambda r: Paper(*values(r))], records
+    )
+    n = len(records)
+    print(f"{name:<9} cũ {old / n * 1e6:7.2f} µs/bài | dict {as_dict / n * 1e6:7.2f} µs/bài (x{old / as_dict:.2f}) "
+          f"| Paper {as_paper / n * 1e6:7.2f} µs/bài (x{old / as_paper:.2f})")
+
+    # Bộ nhớ giữ lại khi parse cả loạt (gồm cả chuỗi của từng bài): list dict cũ vs list Paper
+    sample = records[:5000]
+    dict_bytes = retained_bytes(lambda: [legacy(r) for r in sample])
+    slot_bytes = retained_bytes(lambda: [Paper(*values(r)) for r in sample])
+    print(f"{'':<9} bộ nhớ dict {dict_bytes / len(sample):6.0f} B/bài | Paper {slot_bytes / len(sample):6.0f} B/bài "
+          f"(-{(1 - slot_bytes / dict_bytes) * 100:.0f}%)")
+
+
+def main():
+    rng = random.Random(0)
+    print(f"📊 {N_RECORDS} bản ghi mỗi nguồn, abstract {ABSTRACT_WORDS} từ, lấy lần nhanh nhất / {REPEAT}")
+
+    openalex = make_openalex_items(N_RECORDS, rng)
+    indexes = [item["abstract_inverted_index"] for item in openalex]
+    for index in indexes[:500]:
+        assert legacy_decode_openalex_abstract(index) == decode_openalex_abstract(index)
+    old, new = best_times([legacy_decode_openalex_abstract, decode_openalex_abstract], indexes)
+    print(f"abstract  cũ {old / N_RECORDS * 1e6:7.2f} µs/bài | mảng vị trí {new / N_RECORDS * 1e6:7.2f} µs/bài "
+          f"(x{old / new:.2f})")
+
+    bench_source("OpenAlex", openalex, legacy_parse_openalex_item, openalex_values)
+    bench_source("arXiv", make_arxiv_entries(N_RECORDS, rng), legacy_parse_arxiv_entry, arxiv_values)
+    bench_source("Crossref", make_crossref_items(N_RECORDS, rng), legacy_parse_crossref_item, crossref_values)
+
+
+if __name__ == "__main__":
+    main()
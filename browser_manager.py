@@ -0,0 +1,197 @@
+import atexit
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Số Chrome headless tối đa giữ ấm trong tiến trình (dùng chung mọi phiên Streamlit)
+BROWSER_POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", 4))
+# Tái tạo trình duyệt sau N trang hoặc khi JS heap vượt ngưỡng (MB)
+BROWSER_MAX_PAGES = int(os.getenv("BROWSER_MAX_PAGES", 200))
+BROWSER_MAX_HEAP_MB = int(os.getenv("BROWSER_MAX_HEAP_MB", 512))
+
+
+class _Slot:
+    def __init__(self, driver):
+        self.driver = driver
+        self.pages = 0
+        self.created = time.monotonic()
+
+
+class BrowserManager:
+    """
+    Pool trình duyệt headless được giữ ấm giữa các lần tìm kiếm.
+
+    - acquire()/release() (hoặc context manager browser()) an toàn giữa các thread.
+    - Khi lấy ra: health-check, driver chết thì tạo lại.
+    - Khi trả về: dọn tab thừa; vượt max_pages hoặc max_heap_mb thì đóng để lần sau tạo mới.
+    """
+
+    def __init__(self, factory, max_size=BROWSER_POOL_SIZE, max_pages=BROWSER_MAX_PAGES,
+                 max_heap_mb=BROWSER_MAX_HEAP_MB):
+        self.factory = factory
+        self.max_size = max(1, max_size)
+        self.max_pages = max_pages
+        self.max_heap = max_heap_mb * 1024 * 1024
+        self.created = 0
+        self.recycled = 0
+        self._idle = []
+        self._busy = {}
+        self._total = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    # ---------- vòng đời driver ----------
+    def _is_healthy(self, driver):
+        try:
+            driver.execute_script("return 1")
+            return bool(driver.window_handles)
+        except Exception:
+            return False
+
+    def _should_recycle(self, slot):
+        if slot.pages >= self.max_pages:
+            return True
+        try:
+            heap = slot.driver.execute_script(
+                "return (performance.memory && performance.memory.usedJSHeapSize) || 0"
+            )
+            return heap > self.max_heap
+        except Exception:
+            return True
+
+    def _quit(self, slot):
+        try:
+            slot.driver.quit()
+        except Exception:
+            pass
+
+    def _reset(self, driver):
+        """Đóng tab thừa và về trang trắng trước khi trả driver vào pool."""
+        handles = driver.window_handles
+        for handle in handles[1:]:
+            driver.switch_to.window(handle)
+            driver.close()
+        driver.switch_to.window(handles[0])
+        driver.get("about:blank")
+
+    # ---------- API ----------
+    def acquire(self, block=True, timeout=None):
+        """
+        Lấy một driver (tạo mới nếu pool chưa đầy).
+        block=False hoặc hết timeout mà không có driver -> None.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._cond:
+                while not self._idle and self._total >= self.max_size:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if not block or (remaining is not None and remaining <= 0):
+                        return None
+                    self._cond.wait(remaining)
+                if self._closed:
+                    raise RuntimeError("BrowserManager đã shutdown")
+                slot = self._idle.pop() if self._idle else None
+                if slot is None:
+                    self._total += 1
+
+            if slot is None:
+                try:
+                    slot = _Slot(self.factory())
+                except Exception:
+                    with self._cond:
+                        self._total -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self.created += 1
+            elif not self._is_healthy(slot.driver):
+                self._quit(slot)
+                with self._cond:
+                    self._total -= 1
+                    self.recycled += 1
+                continue
+
+            with self._cond:
+                self._busy[id(slot.driver)] = slot
+            return slot.driver
+
+    def mark_page(self, driver, count=1):
+        """Ghi nhận driver vừa mở thêm trang (để tái tạo sau max_pages)."""
+        with self._cond:
+            slot = self._busy.get(id(driver))
+            if slot:
+                slot.pages += count
+
+    def release(self, driver):
+        with self._cond:
+            slot = self._busy.pop(id(driver), None)
+        if slot is None:
+            return
+
+        keep = not self._closed and self._is_healthy(driver) and not self._should_recycle(slot)
+        if keep:
+            try:
+                self._reset(driver)
+            except Exception:
+                keep = False
+        if not keep:
+            self._quit(slot)
+
+        with self._cond:
+            if keep:
+                self._idle.append(slot)
+            else:
+                self._total -= 1
+                self.recycled += 1
+            self._cond.notify()
+
+    @contextmanager
+    def browser(self, timeout=None):
+        driver = self.acquire(timeout=timeout)
+        if driver is None:
+            raise TimeoutError("Không lấy được trình duyệt từ pool")
+        try:
+            yield driver
+        finally:
+            self.release(driver)
+
+    def warm(self, n=1):
+        """Khởi động trước n trình duyệt để lần tìm kiếm đầu không chịu cold start."""
+        drivers = [d for d in (self.acquire(block=False) for _ in range(n)) if d is not None]
+        for driver in drivers:
+            self.release(driver)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "idle": len(self._idle),
+                "busy": len(self._busy),
+                "created": self.created,
+                "recycled": self.recycled,
+            }
+
+    def shutdown(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._total -= len(idle)
+            self._cond.notify_all()
+        for slot in idle:
+            self._quit(slot)
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_browser_manager(factory=None):
+    """BrowserManager dùng chung cho cả tiến trình (tạo ở lần gọi đầu)."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            if factory is None:
+                raise ValueError("Cần truyền factory khi khởi tạo BrowserManager lần đầu")
+            _manager = BrowserManager(factory)
+            atexit.register(_manager.shutdown)
+        return _manager
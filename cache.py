@@ -0,0 +1,322 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+CACHE_DIR = "cache"
+LLM_CACHE_FILE = "llm_cache.sqlite"
+
+
+def make_key(*parts):
+    """Khóa nội dung: sha256 của các thành phần (model, prompt template, keywords, abstract...)."""
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(str(part).encode("utf-8"))
+        h.update(b"\x1f")
+    return h.hexdigest()
+
+
+def connect(path):
+    """Mở SQLite dùng chung giữa các thread (WAL để đọc không chặn ghi)."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+# ========================
+# Cache kết quả LLM (relevance / summary)
+# ========================
+class LLMCache:
+    """
+    Cache trên đĩa cho kết quả Gemini, khóa theo nội dung (xem make_key).
+    Giá trị lưu dạng JSON. Bản ghi quá max_age_days bị coi là miss; khi vượt
+    max_entries thì xóa các bản ghi ít được dùng gần đây nhất.
+    """
+
+    def __init__(self, path=os.path.join(CACHE_DIR, LLM_CACHE_FILE), max_entries=50000, max_age_days=180):
+        self.max_entries = max_entries
+        self.max_age = max_age_days * 86400
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+            " created_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_access ON llm_cache(last_access)")
+        self._conn.commit()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.max_age:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return json.loads(row[0])
+
+    def set(self, key, value):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now, now)
+            )
+            self._conn.commit()
+
+    def evict(self):
+        """Xóa bản ghi hết hạn và bản ghi LRU vượt quá max_entries. Trả về số bản ghi đã xóa."""
+        with self._lock:
+            cur = self._conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (time.time() - self.max_age,))
+            removed = cur.rowcount
+            cur = self._conn.execute(
+                "DELETE FROM llm_cache WHERE key IN ("
+                " SELECT key FROM llm_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+            removed += cur.rowcount
+            self._conn.commit()
+            return removed
+
+    def stats(self):
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "entries": size}
+
+
+_llm_cache = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache():
+    """LLMCache dùng chung cho cả tiến trình (dọn dẹp một lần khi mở)."""
+    global _llm_cache
+    with _llm_cache_lock:
+        if _llm_cache is None:
+            _llm_cache = LLMCache()
+            _llm_cache.evict()
+        return _llm_cache
+
+
+# ========================
+# Cache response HTTP của các API nguồn
+# ========================
+HTTP_CACHE_FILE = "http_cache.sqlite"
+
+
+def _header(headers, name):
+    name = name.lower()
+    return next((v for k, v in headers.items() if k.lower() == name), None)
+
+
+class ResponseCache:
+    """
+    Lưu body + ETag/Last-Modified của response GET, khóa theo (url, params).
+    Thống kê: hits (còn hạn TTL), revalidated (server trả 304), misses.
+    """
+
+    def __init__(self, path=os.path.join(CACHE_DIR, HTTP_CACHE_FILE), max_age_days=30):
+        self.max_age = max_age_days * 86400
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS http_cache ("
+            " key TEXT PRIMARY KEY, url TEXT NOT NULL, status INTEGER NOT NULL,"
+            " headers TEXT NOT NULL, body BLOB NOT NULL,"
+            " etag TEXT, last_modified TEXT, fetched_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url, status, headers, body, etag, last_modified, fetched_at FROM http_cache WHERE key = ?",
+                (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "url": row[0], "status": row[1], "headers": json.loads(row[2]), "body": row[3],
+            "etag": row[4], "last_modified": row[5], "fetched_at": row[6],
+        }
+
+    def set(self, key, url, status, headers, body):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO http_cache"
+                " (key, url, status, headers, body, etag, last_modified, fetched_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, url, status, json.dumps(headers), body,
+                 _header(headers, "ETag"), _header(headers, "Last-Modified"), time.time())
+            )
+            self._conn.commit()
+
+    def record(self, outcome):
+        """Tăng bộ đếm "hits" / "revalidated" / "misses"."""
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def touch(self, key):
+        """Server xác nhận 304 -> làm mới thời điểm fetch."""
+        with self._lock:
+            self._conn.execute("UPDATE http_cache SET fetched_at = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+
+    def evict(self):
+        with self._lock:
+            cur = self._conn.execute("DELETE FROM http_cache WHERE fetched_at < ?", (time.time() - self.max_age,))
+            self._conn.commit()
+            return cur.rowcount
+
+    def stats(self):
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM http_cache").fetchone()[0]
+        return {"hits": self.hits, "revalidated": self.revalidated, "misses": self.misses, "entries": size}
+
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """ResponseCache dùng chung cho cả tiến trình (dọn dẹp một lần khi mở)."""
+    global _response_cache
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache()
+            _response_cache.evict()
+        return _response_cache
+
+
+# ========================
+# Cache kết quả Firecrawl theo URL + theo dõi domain lỗi
+# ========================
+SCRAPE_CACHE_FILE = "scrape_cache.sqlite"
+
+
+class ScrapeCache:
+    """
+    URL -> abstract đã trích xuất từ Firecrawl.
+
+    - Kết quả có abstract được giữ max_age_days.
+    - Kết quả "Not Available" (negative cache) chỉ giữ negative_ttl_days rồi thử lại.
+    - Domain thất bại liên tiếp >= domain_failure_limit lần (chưa từng thành công)
+      bị bỏ qua trong domain_cooldown_days kể từ lần lỗi cuối.
+    """
+
+    def __init__(self, path=os.path.join(CACHE_DIR, SCRAPE_CACHE_FILE), max_age_days=365,
+                 negative_ttl_days=14, domain_failure_limit=5, domain_cooldown_days=30):
+        self.max_age = max_age_days * 86400
+        self.negative_ttl = negative_ttl_days * 86400
+        self.domain_failure_limit = domain_failure_limit
+        self.domain_cooldown = domain_cooldown_days * 86400
+        self.hits = 0
+        self.negative_hits = 0
+        self.skipped_domains = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS scrape_cache ("
+            " url TEXT PRIMARY KEY, abstract TEXT, fetched_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS scrape_domains ("
+            " domain TEXT PRIMARY KEY, failures INTEGER NOT NULL DEFAULT 0,"
+            " successes INTEGER NOT NULL DEFAULT 0, last_failure REAL)"
+        )
+        self._conn.commit()
+
+    def lookup(self, url):
+        """
+        Trả về (True, abstract) nếu đã có kết quả còn hạn (abstract None = negative cache),
+        hoặc (False, None) nếu cần scrape.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT abstract, fetched_at FROM scrape_cache WHERE url = ?", (url,)
+            ).fetchone()
+            if row is not None:
+                abstract, fetched_at = row
+                if abstract is not None and now - fetched_at < self.max_age:
+                    self.hits += 1
+                    return True, abstract
+                if abstract is None and now - fetched_at < self.negative_ttl:
+                    self.negative_hits += 1
+                    return True, None
+            self.misses += 1
+            return False, None
+
+    def is_domain_blocked(self, domain):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT failures, successes, last_failure FROM scrape_domains WHERE domain = ?", (domain,)
+            ).fetchone()
+            blocked = (
+                row is not None
+                and row[1] == 0
+                and row[0] >= self.domain_failure_limit
+                and time.time() - (row[2] or 0) < self.domain_cooldown
+            )
+            if blocked:
+                self.skipped_domains += 1
+            return blocked
+
+    def store(self, url, domain, abstract):
+        """Ghi kết quả scrape (abstract None = thất bại) và cập nhật thống kê domain."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO scrape_cache (url, abstract, fetched_at) VALUES (?, ?, ?)",
+                (url, abstract, now)
+            )
+            if abstract is None:
+                self._conn.execute(
+                    "INSERT INTO scrape_domains (domain, failures, last_failure) VALUES (?, 1, ?)"
+                    " ON CONFLICT(domain) DO UPDATE SET failures = failures + 1, last_failure = excluded.last_failure",
+                    (domain, now)
+                )
+            else:
+                self._conn.execute(
+                    "INSERT INTO scrape_domains (domain, successes) VALUES (?, 1)"
+                    " ON CONFLICT(domain) DO UPDATE SET successes = successes + 1, failures = 0",
+                    (domain,)
+                )
+            self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "negative_hits": self.negative_hits,
+                "skipped_domains": self.skipped_domains,
+                "misses": self.misses,
+            }
+
+
+_scrape_cache = None
+_scrape_cache_lock = threading.Lock()
+
+
+def get_scrape_cache():
+    """ScrapeCache dùng chung cho cả tiến trình."""
+    global _scrape_cache
+    with _scrape_cache_lock:
+        if _scrape_cache is None:
+            _scrape_cache = ScrapeCache()
+        return _scrape_cache
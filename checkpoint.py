@@ -0,0 +1,114 @@
+import json
+import os
+import threading
+import time
+
+from cache import CACHE_DIR, connect
+
+CHECKPOINT_FILE = "checkpoints.sqlite"
+# Workflow chạy mỗi 12h; cửa sổ 36h vẫn tiếp tục được run lỗi / hết giờ dù GitHub trễ lịch
+# hay bỏ lỡ một lượt, nhưng không kéo dài run cũ hơn vài ngày
+RESUME_WINDOW_HOURS = 36
+
+
+class CheckpointStore:
+    """
+    Lưu tiến độ pipeline theo run / stage / bài báo (SQLite, WAL).
+
+    - runs: mỗi lần chạy pipeline; run chưa "completed" sẽ được tiếp tục ở lần chạy sau.
+    - stage_items: output của từng bài ở từng stage (None = bài bị loại ở stage đó).
+    - stage_runs: trạng thái và tổng thời gian (giây) của từng stage.
+    Mỗi lần save_items là một transaction, nên tiến trình bị kill chỉ mất phần đang xử lý dở.
+    """
+
+    def __init__(self, path=os.path.join(CACHE_DIR, CHECKPOINT_FILE), max_age_days=14):
+        self.max_age = max_age_days * 86400
+        self._lock = threading.Lock()
+        self._conn = connect(path)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS runs (
+                run_id INTEGER PRIMARY KEY, name TEXT NOT NULL, status TEXT NOT NULL,
+                created_at REAL NOT NULL, finished_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS stage_items (
+                run_id INTEGER NOT NULL, stage TEXT NOT NULL, item_key TEXT NOT NULL, output TEXT,
+                PRIMARY KEY (run_id, stage, item_key)
+            );
+            CREATE TABLE IF NOT EXISTS stage_runs (
+                run_id INTEGER NOT NULL, stage TEXT NOT NULL, status TEXT NOT NULL,
+                seconds REAL NOT NULL DEFAULT 0, items INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (run_id, stage)
+            );
+            """
+        )
+        self._conn.commit()
+        self.purge()
+
+    def resume_or_create(self, name, resume_window_hours=RESUME_WINDOW_HOURS):
+        """
+        Run chưa hoàn thành gần nhất (bắt đầu trong resume_window_hours) của pipeline `name`,
+        hoặc tạo run mới. Trả về (run_id, resumed).
+        """
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT run_id FROM runs WHERE name = ? AND status != 'completed' AND created_at >= ?"
+                " ORDER BY run_id DESC LIMIT 1",
+                (name, time.time() - resume_window_hours * 3600)
+            ).fetchone()
+            if row:
+                return row[0], True
+            cur = self._conn.execute(
+                "INSERT INTO runs (name, status, created_at) VALUES (?, 'running', ?)", (name, time.time())
+            )
+            return cur.lastrowid, False
+
+    def finish_run(self, run_id, status="completed"):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE runs SET status = ?, finished_at = ? WHERE run_id = ?", (status, time.time(), run_id)
+            )
+
+    def load_items(self, run_id, stage):
+        """{item_key: output} của các bài đã xong ở stage."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT item_key, output FROM stage_items WHERE run_id = ? AND stage = ?", (run_id, stage)
+            ).fetchall()
+        return {key: (json.loads(output) if output is not None else None) for key, output in rows}
+
+    def save_items(self, run_id, stage, outputs):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO stage_items (run_id, stage, item_key, output) VALUES (?, ?, ?, ?)",
+                [(run_id, stage, key, None if output is None else json.dumps(output, ensure_ascii=False))
+                 for key, output in outputs.items()]
+            )
+
+    def record_stage(self, run_id, stage, status, seconds, items):
+        """Cộng dồn thời gian của stage qua các lần chạy lại."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO stage_runs (run_id, stage, status, seconds, items) VALUES (?, ?, ?, ?, ?)"
+                " ON CONFLICT(run_id, stage) DO UPDATE SET status = excluded.status,"
+                " seconds = seconds + excluded.seconds, items = excluded.items",
+                (run_id, stage, status, seconds, items)
+            )
+
+    def stage_stats(self, run_id):
+        """{stage: {"status", "seconds", "items"}} theo thứ tự stage được ghi lần đầu."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT stage, status, seconds, items FROM stage_runs WHERE run_id = ? ORDER BY rowid", (run_id,)
+            ).fetchall()
+        return {stage: {"status": status, "seconds": round(seconds, 2), "items": items}
+                for stage, status, seconds, items in rows}
+
+    def purge(self):
+        """Xóa checkpoint của các run cũ hơn max_age_days."""
+        cutoff = time.time() - self.max_age
+        with self._lock, self._conn:
+            old = [r[0] for r in self._conn.execute("SELECT run_id FROM runs WHERE created_at < ?", (cutoff,))]
+            for table in ("stage_items", "stage_runs", "runs"):
+                self._conn.executemany(f"DELETE FROM {table} WHERE run_id = ?", [(r,) for r in old])
+
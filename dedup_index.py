@@ -0,0 +1,132 @@
+import hashlib
+import math
+import os
+import struct
+
+from cache import CACHE_DIR
+from paper_store import paper_keys
+
+INDEX_FILE = "dedup.bloom"
+DEFAULT_CAPACITY = 100_000
+DEFAULT_ERROR_RATE = 0.001
+FRESHNESS_SAMPLE = 200  # số bài mới nhất trong PaperStore dùng để kiểm tra filter còn khớp
+
+_HEADER = struct.Struct("<4sQIQQd")  # magic, số bit, số hash, số key đã thêm, capacity, error rate
+_MAGIC = b"BLM1"
+
+
+class BloomFilter:
+    """Bloom filter trên bytearray, k vị trí sinh từ 2 hash 64-bit (Kirsch–Mitzenmacher)."""
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, error_rate=DEFAULT_ERROR_RATE):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.count = 0
+        self.bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1, h2 = struct.unpack("<QQ", digest)
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+
+    def add(self, key):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    def save(self, path):
+        """Ghi ra file tạm rồi os.replace để không bao giờ để lại file hỏng."""
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, self.num_bits, self.num_hashes, self.count,
+                                 self.capacity, self.error_rate))
+            f.write(self.bits)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            magic, num_bits, num_hashes, count, capacity, error_rate = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != _MAGIC:
+                raise ValueError(f"File Bloom filter không hợp lệ: {path}")
+            bloom = cls.__new__(cls)
+            bloom.capacity, bloom.error_rate = capacity, error_rate
+            bloom.num_bits, bloom.num_hashes, bloom.count = num_bits, num_hashes, count
+            bloom.bits = bytearray(f.read())
+        if len(bloom.bits) != (num_bits + 7) // 8:
+            raise ValueError(f"File Bloom filter bị cắt cụt: {path}")
+        return bloom
+
+
+def _prefixed(keys):
+    doi_key, link_key, title_key = keys
+    return [f"{kind}:{key}" for kind, key in (("doi", doi_key), ("link", link_key), ("title", title_key)) if key]
+
+
+def index_keys(paper):
+    """Các key (có tiền tố loại) của bài báo, cùng chuẩn hóa với PaperStore."""
+    return _prefixed(paper_keys(paper))
+
+
+class DedupIndex:
+    """
+    Index lọc trùng lưu trên đĩa (cache/dedup.bloom), cập nhật dần sau mỗi lần lưu.
+    Bloom filter trả lời "chắc chắn chưa có" với O(1); khi filter báo "có thể có"
+    thì xác nhận lại bằng PaperStore (truy vấn theo unique index) để không loại nhầm.
+    File chỉ là dữ liệu dẫn xuất: thiếu, hỏng hoặc cũ hơn PaperStore (cache khôi phục
+    từ lần chạy trước) thì dựng lại từ PaperStore.
+    """
+
+    def __init__(self, store, cache_dir=CACHE_DIR, index_file=INDEX_FILE):
+        self.store = store
+        self.path = os.path.join(cache_dir, index_file)
+        self.false_positives = 0
+        self.bloom = None
+        if os.path.exists(self.path):
+            try:
+                self.bloom = BloomFilter.load(self.path)
+            except (OSError, ValueError, struct.error) as e:
+                print(f"⚠️ {e} -> dựng lại dedup index")
+        if self.bloom is not None and not self.is_fresh():
+            print("⚠️ Dedup index cũ hơn PaperStore -> dựng lại")
+            self.bloom = None
+        if self.bloom is None:
+            self.rebuild()
+
+    def is_fresh(self, sample=FRESHNESS_SAMPLE):
+        """Mọi key của `sample` bài mới nhất trong PaperStore đều có trong filter."""
+        return all(key in self.bloom for keys in self.store.iter_keys(latest=sample) for key in _prefixed(keys))
+
+    def rebuild(self, capacity=None):
+        """Dựng lại filter từ toàn bộ PaperStore (lần đầu, hoặc khi vượt capacity)."""
+        capacity = capacity or max(DEFAULT_CAPACITY, 2 * len(self.store))
+        self.bloom = BloomFilter(capacity)
+        for keys in self.store.iter_keys():
+            for key in _prefixed(keys):
+                self.bloom.add(key)
+        self.save()
+        print(f"🧱 Đã dựng dedup index cho {len(self.store)} bài báo")
+
+    def add_papers(self, papers):
+        for paper in papers:
+            for key in index_keys(paper):
+                self.bloom.add(key)
+        if self.bloom.count > self.bloom.capacity:
+            self.rebuild(capacity=2 * self.bloom.capacity)
+
+    def contains(self, paper):
+        if not any(key in self.bloom for key in index_keys(paper)):
+            return False
+        if self.store.contains(paper):
+            return True
+        self.false_positives += 1
+        return False
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self.bloom.save(self.path)
@@ -0,0 +1,317 @@
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+
+from paper_store import normalize_doi
+
+# MinHash/LSH: chữ ký 64 giá trị, 16 band x 4 hàng -> cặp có Jaccard ~0.5 trở lên gần như chắc chắn thành ứng viên
+MINHASH_PERMUTATIONS = 64
+LSH_BANDS = 16
+SHINGLE_SIZE = 4
+# Ngưỡng xác nhận ứng viên: Jaccard shingle của title, và ngưỡng cho phép bỏ qua kiểm tra tác giả
+TITLE_SIMILARITY = 0.8
+TITLE_SIMILARITY_NO_AUTHORS = 0.95
+
+# Trường mà bản ghi trùng đến sau có thể bổ sung để bài bị loại trước đó được xử lý lại
+# (abstract: lọc liên quan / tóm tắt; link: Firecrawl lấy abstract; title: prefilter)
+RECOVERABLE_FIELDS = ("abstract", "link", "title")
+
+PLACEHOLDERS = {"", "not available", "no title", "authors not found", "error accessing paper"}
+
+_ARXIV_PATTERN = re.compile(
+    r"(?:arxiv\.org/(?:abs|pdf)/|arxiv[.:])((?:\d{4}\.\d{4,5})|(?:[a-z\-]+(?:\.[a-z]{2})?/\d{7}))(?:v\d+)?",
+    re.I,
+)
+_HASH_MASK = (1 << 64) - 1
+_DENSIFY_OFFSET = 1 << 64
+
+
+# ==============================
+# Trích xuất định danh
+# ==============================
+def is_missing(value):
+    return value is None or str(value).strip().lower() in PLACEHOLDERS
+
+
+def extract_doi(paper):
+    """DOI từ trường doi hoặc từ link (doi.org, link publisher có chứa DOI)."""
+    return normalize_doi(paper.get("doi") or "") or normalize_doi(paper.get("link") or "")
+
+
+def extract_arxiv_id(paper):
+    """arXiv id (không kèm version) từ link arxiv.org hoặc DOI 10.48550/arXiv.*"""
+    for value in (paper.get("link"), paper.get("doi")):
+        match = _ARXIV_PATTERN.search(value or "")
+        if match:
+            return match.group(1).lower()
+    return ""
+
+
+def _ascii(text):
+    return unicodedata.normalize("NFKD", text or "").encode("ascii", "ignore").decode().lower()
+
+
+def title_shingles(title):
+    """Tập shingle ký tự (độ dài SHINGLE_SIZE) của title đã chuẩn hóa."""
+    text = " ".join(re.sub(r"[^a-z0-9]+", " ", _ascii(title)).split())
+    if len(text) <= SHINGLE_SIZE:
+        return {text} if text else set()
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def author_surnames(authors):
+    """
+    Họ của các tác giả (token cuối mỗi tên). Chuỗi tác giả của Google Scholar có dạng
+    "A Smith, B Lee - Journal, 2024 - host" nên chỉ lấy phần trước " - ".
+    """
+    if is_missing(authors):
+        return set()
+    names = _ascii(authors).split(" - ")[0].replace("…", "").split(",")
+    surnames = set()
+    for name in names:
+        tokens = re.findall(r"[a-z]+", name)
+        if tokens and len(tokens[-1]) > 1:
+            surnames.add(tokens[-1])
+    return surnames
+
+
+# ==============================
+# MinHash / LSH
+# ==============================
+def minhash_signature(shingles):
+    """
+    Chữ ký MinHash một hoán vị (one-permutation hashing): mỗi shingle chỉ băm một lần,
+    vào bin theo các bit thấp, giữ giá trị nhỏ nhất mỗi bin; bin rỗng mượn giá trị
+    của bin không rỗng kế tiếp (densification) -> O(số shingle) thay vì O(k x số shingle).
+    """
+    empty = _HASH_MASK + 1
+    signature = [empty] * MINHASH_PERMUTATIONS
+    for shingle in shingles:
+        h = hash(shingle) & _HASH_MASK  # chữ ký chỉ dùng trong tiến trình nên hash() (có salt) là đủ
+        b, v = h % MINHASH_PERMUTATIONS, h // MINHASH_PERMUTATIONS
+        if v < signature[b]:
+            signature[b] = v
+    for b in range(MINHASH_PERMUTATIONS):
+        if signature[b] == empty:
+            for step in range(1, MINHASH_PERMUTATIONS):
+                donor = signature[(b + step) % MINHASH_PERMUTATIONS]
+                if donor < empty:
+                    signature[b] = donor + step * _DENSIFY_OFFSET
+                    break
+    return signature
+
+
+def lsh_candidates(signatures, bands=LSH_BANDS):
+    """
+    Cặp (i, j) có ít nhất một band chữ ký trùng nhau. Mỗi bài chỉ được băm vào
+    `bands` bucket nên chi phí gần tuyến tính theo số bài.
+    """
+    rows = MINHASH_PERMUTATIONS // bands
+    pairs = set()
+    for band in range(bands):
+        buckets = defaultdict(list)
+        for idx, signature in signatures.items():
+            buckets[tuple(signature[band * rows:(band + 1) * rows])].append(idx)
+        for members in buckets.values():
+            for pos, i in enumerate(members):
+                for j in members[pos + 1:]:
+                    pairs.add((i, j))
+    return pairs
+
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+def is_title_match(shingles_a, authors_a, shingles_b, authors_b):
+    """Xác nhận cặp ứng viên LSH: title đủ giống và có chung tác giả (hoặc title gần như trùng khi thiếu tác giả)."""
+    similarity = jaccard(shingles_a, shingles_b)
+    if similarity < TITLE_SIMILARITY:
+        return False
+    surnames_a, surnames_b = author_surnames(authors_a), author_surnames(authors_b)
+    if surnames_a and surnames_b:
+        return bool(surnames_a & surnames_b)
+    return similarity >= TITLE_SIMILARITY_NO_AUTHORS
+
+
+# ==============================
+# Gộp bản ghi
+# ==============================
+def _richness(paper):
+    filled = sum(not is_missing(paper.get(field)) for field in ("title", "abstract", "authors", "link", "pub_date"))
+    abstract = paper.get("abstract")
+    return filled + (0 if is_missing(abstract) else min(len(abstract), 5000) / 5000)
+
+
+def _citations(paper):
+    try:
+        return int(str(paper.get("citations") or 0).replace(",", ""))
+    except ValueError:
+        return 0
+
+
+def merge_records(papers):
+    """
+    Gộp các bản ghi của cùng một bài: lấy bản ghi đầy đủ nhất làm gốc, abstract dài nhất,
+    danh sách tác giả dài nhất, citations lớn nhất, bổ sung trường còn thiếu từ bản ghi khác.
+    """
+    if len(papers) == 1:
+        return papers[0]
+    ranked = sorted(papers, key=_richness, reverse=True)
+    merged = dict(ranked[0])
+    for paper in ranked[1:]:
+        for field, value in paper.items():
+            if is_missing(merged.get(field)) and not is_missing(value):
+                merged[field] = value
+
+    abstracts = [p["abstract"] for p in papers if not is_missing(p.get("abstract"))]
+    if abstracts:
+        merged["abstract"] = max(abstracts, key=len)
+    authors = [p["authors"] for p in papers if author_surnames(p.get("authors"))]
+    if authors:
+        merged["authors"] = max(authors, key=lambda a: len(author_surnames(a)))
+    merged["citations"] = max(_citations(p) for p in papers)
+    # source của bản ghi đã gộp trước đó có dạng "OpenAlex, arXiv" -> tách ra trước khi bỏ trùng
+    merged["source"] = ", ".join(dict.fromkeys(
+        source for p in papers for source in (p.get("source") or "").split(", ") if source
+    ))
+    doi = next((extract_doi(p) for p in papers if extract_doi(p)), "")
+    if doi:
+        merged["doi"] = doi
+    return merged
+
+
+def resolve_entities(papers):
+    """
+    Hợp nhất các bản ghi cùng một bài báo đến từ nhiều nguồn.
+
+    Hai bản ghi được coi là một bài khi trùng DOI, trùng arXiv id, hoặc là ứng viên
+    MinHash/LSH trên shingle của title có Jaccard >= TITLE_SIMILARITY và có chung
+    ít nhất một họ tác giả (khi thiếu tác giả thì yêu cầu TITLE_SIMILARITY_NO_AUTHORS).
+
+    Parameters:
+        papers (list): Danh sách bài báo (dict) từ các nguồn.
+
+    Returns:
+        list: Danh sách đã gộp, giữ thứ tự xuất hiện đầu tiên của mỗi bài.
+    """
+    parent = list(range(len(papers)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(i, j):
+        ri, rj = find(i), find(j)
+        if ri != rj:
+            parent[max(ri, rj)] = min(ri, rj)
+
+    # 1. Định danh chính xác: DOI, arXiv id
+    seen = {}
+    for idx, paper in enumerate(papers):
+        for key in (f"doi:{extract_doi(paper)}", f"arxiv:{extract_arxiv_id(paper)}"):
+            if key.endswith(":"):
+                continue
+            if key in seen:
+                union(seen[key], idx)
+            else:
+                seen[key] = idx
+
+    # 2. Title gần giống (MinHash/LSH) + kiểm tra tác giả
+    shingles = {idx: title_shingles(p.get("title")) for idx, p in enumerate(papers) if not is_missing(p.get("title"))}
+    signatures = {idx: minhash_signature(s) for idx, s in shingles.items() if s}
+    for i, j in lsh_candidates(signatures):
+        if find(i) == find(j):
+            continue
+        if is_title_match(shingles[i], papers[i].get("authors"), shingles[j], papers[j].get("authors")):
+            union(i, j)
+
+    clusters = defaultdict(list)
+    for idx in range(len(papers)):
+        clusters[find(idx)].append(papers[idx])
+    merged = [merge_records(clusters[root]) for root in sorted(clusters)]
+    print(f"🔗 Hợp nhất bài trùng giữa các nguồn: {len(papers)} -> {len(merged)} bài")
+    return merged
+
+
+class EntityResolver:
+    """
+    Phiên bản tăng dần của resolve_entities cho pipeline streaming. Bài đến sau trùng với
+    bài đã thấy KHÔNG được ghi vào bản ghi đã chuyển đi (bản ghi đó có thể đang được một
+    stage sau sửa, và đổi doi / link làm đổi khóa checkpoint giữa các stage) mà được giữ lại:
+    - nếu bản trùng có trường mà bản ghi đã chuyển đi còn thiếu (RECOVERABLE_FIELDS, vd:
+      abstract từ Google Scholar cho bài OpenAlex không có abstract), on_update(canonical,
+      fills) được gọi để pipeline bổ sung và đưa lại bản ghi khi nó đã rời stage;
+    - apply_merges() gộp đầy đủ (source, citations, doi...) sau khi mọi stage đã xong.
+    """
+
+    def __init__(self, on_update=None):
+        self.on_update = on_update
+        self.merged = 0
+        self._duplicates = {}
+        self._ids = {}
+        self._buckets = [defaultdict(list) for _ in range(LSH_BANDS)]
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _ids_of(paper):
+        return [key for key in (f"doi:{extract_doi(paper)}", f"arxiv:{extract_arxiv_id(paper)}")
+                if not key.endswith(":")]
+
+    @staticmethod
+    def _bands(signature):
+        rows = MINHASH_PERMUTATIONS // LSH_BANDS
+        return [tuple(signature[band * rows:(band + 1) * rows]) for band in range(LSH_BANDS)]
+
+    def _match(self, paper, ids, shingles, bands):
+        for key in ids:
+            if key in self._ids:
+                return self._ids[key]
+        for band, bucket_key in enumerate(bands):
+            for other_shingles, other in self._buckets[band].get(bucket_key, ()):
+                if is_title_match(shingles, paper.get("authors"), other_shingles, other.get("authors")):
+                    return other
+        return None
+
+    def add(self, paper):
+        """Trả về paper nếu là bài mới; nếu trùng bài đã thấy thì ghi nhận vào bài đó và trả về None."""
+        ids = self._ids_of(paper)
+        shingles = set() if is_missing(paper.get("title")) else title_shingles(paper["title"])
+        bands = self._bands(minhash_signature(shingles)) if shingles else []
+        fills = {}
+        with self._lock:
+            canonical = self._match(paper, ids, shingles, bands)
+            if canonical is None:
+                canonical = paper
+            else:
+                self._duplicates.setdefault(id(canonical), (canonical, []))[1].append(paper)
+                fills = {field: paper[field] for field in RECOVERABLE_FIELDS
+                         if is_missing(canonical.get(field)) and not is_missing(paper.get(field))}
+                self.merged += 1
+            for key in ids:
+                self._ids.setdefault(key, canonical)
+            for band, bucket_key in enumerate(bands):
+                self._buckets[band][bucket_key].append((shingles, canonical))
+        if fills and self.on_update is not None:
+            self.on_update(canonical, fills)
+        return paper if canonical is paper else None
+
+    def apply_merges(self, papers):
+        """
+        Gộp các bản trùng đã ghi nhận vào từng bài (in place), gọi khi không còn stage nào
+        giữ các bài này. Trường bài đã có (vd: abstract Firecrawl vừa lấy, summary) được giữ
+        nguyên; source, citations, doi lấy theo bản gộp.
+        """
+        with self._lock:
+            duplicates = dict(self._duplicates)
+        for paper in papers:
+            if id(paper) not in duplicates:
+                continue
+            merged = merge_records([paper, *duplicates[id(paper)][1]])
+            for field, value in merged.items():
+                if field in ("source", "citations", "doi") or is_missing(paper.get(field)):
+                    paper[field] = value
+        return papers
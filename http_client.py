@@ -0,0 +1,254 @@
+import json
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from cache import get_response_cache, make_key
+
+# Mã HTTP được coi là lỗi tạm thời -> thử lại
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_RETRIES = 4
+BACKOFF_BASE = 1.0   # giây
+BACKOFF_MAX = 60.0   # giây, trần cho cả backoff lẫn Retry-After
+
+# online: cache + conditional request; record: như online và ghi thêm fixture;
+# offline: chỉ đọc fixture đã ghi, không gọi mạng
+HTTP_CACHE_MODE = os.getenv("HTTP_CACHE_MODE", "online")
+HTTP_CACHE_TTL = float(os.getenv("HTTP_CACHE_TTL", 3600))  # giây
+FIXTURES_DIR = os.getenv("HTTP_FIXTURES_DIR", os.path.join("fixtures", "http"))
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+_stats = defaultdict(lambda: {"requests": 0, "retries": 0, "failures": 0})
+_stats_lock = threading.Lock()
+
+
+# ========================
+# Session dùng chung theo host
+# ========================
+def get_session(url):
+    """
+    Trả về requests.Session dùng chung cho host của url (keep-alive + connection pool).
+    """
+    host = urlsplit(url).netloc
+    with _sessions_lock:
+        session = _sessions.get(host)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _sessions[host] = session
+        return session
+
+
+def _record(source, field):
+    with _stats_lock:
+        _stats[source][field] += 1
+
+
+def get_http_stats():
+    """Số request / lần thử lại / lần thất bại theo từng nguồn."""
+    with _stats_lock:
+        return {source: dict(counts) for source, counts in _stats.items()}
+
+
+# ========================
+# Retry với exponential backoff + jitter
+# ========================
+def parse_retry_after(response):
+    """
+    Đọc header Retry-After (số giây hoặc HTTP-date). Trả về số giây hoặc None.
+    """
+    value = response.headers.get("Retry-After") if response is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def backoff_delay(attempt):
+    """Full jitter: ngẫu nhiên trong [0, min(BACKOFF_MAX, BACKOFF_BASE * 2^attempt)]."""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+
+def request(method, url, source="default", retries=MAX_RETRIES, limiter=None, **kwargs):
+    """
+    Gửi request qua session dùng chung, tự thử lại khi gặp 429/5xx hoặc lỗi kết nối.
+
+    Parameters:
+        method (str): "GET", "POST", ...
+        url (str): URL đích.
+        source (str): Tên nguồn để thống kê (vd: "OpenAlex").
+        retries (int): Số lần thử lại tối đa.
+        limiter (TokenBucket): Rate limiter của provider (tùy chọn), được báo khi gặp 429.
+        **kwargs: Truyền thẳng cho requests.Session.request (params, json, headers, timeout...).
+
+    Returns:
+        requests.Response: Response thành công (đã raise_for_status).
+
+    Raises:
+        requests.exceptions.RequestException: Khi hết số lần thử lại hoặc lỗi không thể thử lại.
+    """
+    session = get_session(url)
+    attempt = 0
+    while True:
+        if limiter is not None:
+            limiter.acquire()
+        _record(source, "requests")
+        response = None
+        try:
+            response = session.request(method, url, **kwargs)
+            if response.status_code not in RETRY_STATUSES:
+                response.raise_for_status()
+                if limiter is not None:
+                    limiter.on_success()
+                return response
+            error = requests.exceptions.HTTPError(
+                f"{response.status_code} Error for url: {response.url}", response=response
+            )
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            error = e
+        except requests.exceptions.RequestException:
+            _record(source, "failures")
+            raise
+
+        if attempt >= retries:
+            _record(source, "failures")
+            raise error
+
+        delay = parse_retry_after(response)
+        if limiter is not None and response is not None and response.status_code == 429:
+            # limiter tự chặn theo Retry-After và tốc độ mới ở lần acquire() kế tiếp
+            limiter.on_rate_limited(delay)
+            delay = 0.0
+        if delay is None:
+            delay = backoff_delay(attempt)
+        delay = min(delay, BACKOFF_MAX)
+        attempt += 1
+        _record(source, "retries")
+        print(f"[{source}] {error} -> thử lại lần {attempt}/{retries} sau {delay:.1f}s")
+        time.sleep(delay)
+
+
+def get(url, source="default", **kwargs):
+    return request("GET", url, source=source, **kwargs)
+
+
+def post(url, source="default", **kwargs):
+    return request("POST", url, source=source, **kwargs)
+
+
+# ========================
+# GET có cache (TTL + ETag/Last-Modified) và chế độ replay offline
+# ========================
+class CachedResponse:
+    """Response dựng lại từ cache/fixture, đủ các thuộc tính mà search_api dùng."""
+
+    def __init__(self, url, status_code, headers, content):
+        self.url = url
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers)
+        self.content = content
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status_code} Error for url: {self.url}", response=self)
+
+
+def _fixture_path(key):
+    return os.path.join(FIXTURES_DIR, f"{key}.json")
+
+
+def _write_fixture(key, url, params, response):
+    os.makedirs(FIXTURES_DIR, exist_ok=True)
+    with open(_fixture_path(key), "w", encoding="utf-8") as f:
+        json.dump({
+            "url": url,
+            "params": params,
+            "status": response.status_code,
+            "headers": dict(response.headers),
+            # surrogateescape giữ nguyên byte không phải UTF-8 khi replay
+            "body": response.content.decode("utf-8", errors="surrogateescape"),
+        }, f)
+
+
+def _read_fixture(key, url):
+    path = _fixture_path(key)
+    if not os.path.exists(path):
+        raise requests.exceptions.ConnectionError(f"Offline mode: không có fixture cho {url} ({path})")
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return CachedResponse(data["url"], data["status"], data["headers"],
+                          data["body"].encode("utf-8", errors="surrogateescape"))
+
+
+def cached_get(url, source="default", params=None, ttl=None, **kwargs):
+    """
+    GET qua response cache trên đĩa.
+
+    - Còn hạn TTL -> trả từ cache, không gọi mạng.
+    - Hết hạn -> gửi If-None-Match / If-Modified-Since; 304 thì dùng lại body cũ.
+    - HTTP_CACHE_MODE=record ghi thêm fixture; HTTP_CACHE_MODE=offline chỉ đọc fixture.
+
+    Returns:
+        requests.Response hoặc CachedResponse.
+    """
+    ttl = HTTP_CACHE_TTL if ttl is None else ttl
+    key = make_key("GET", url, json.dumps(params or {}, sort_keys=True))
+    if HTTP_CACHE_MODE == "offline":
+        return _read_fixture(key, url)
+
+    cache = get_response_cache()
+    entry = cache.get(key)
+    if entry and time.time() - entry["fetched_at"] < ttl:
+        cache.record("hits")
+        return CachedResponse(entry["url"], entry["status"], entry["headers"], entry["body"])
+
+    headers = dict(kwargs.pop("headers", None) or {})
+    if entry and entry["etag"]:
+        headers["If-None-Match"] = entry["etag"]
+    if entry and entry["last_modified"]:
+        headers["If-Modified-Since"] = entry["last_modified"]
+
+    response = get(url, source=source, params=params, headers=headers, **kwargs)
+    if response.status_code == 304 and entry:
+        cache.record("revalidated")
+        cache.touch(key)
+        response = CachedResponse(entry["url"], entry["status"], entry["headers"], entry["body"])
+    else:
+        cache.record("misses")
+        cache.set(key, response.url, response.status_code, dict(response.headers), response.content)
+
+    if HTTP_CACHE_MODE == "record":
+        _write_fixture(key, url, params, response)
+    return response
+
+
+def get_http_cache_stats():
+    return get_response_cache().stats()
@@ -0,0 +1,160 @@
+from dataclasses import dataclass, fields
+
+NOT_AVAILABLE = "Not Available"
+
+# Tên thẻ Atom dạng {namespace}tag: find() không phải dịch prefix "arxiv:" ở mỗi lần gọi
+_ATOM = "{http://www.w3.org/2005/Atom}"
+_ARXIV_TITLE = _ATOM + "title"
+_ARXIV_SUMMARY = _ATOM + "summary"
+_ARXIV_ID = _ATOM + "id"
+_ARXIV_AUTHOR = _ATOM + "author"
+_ARXIV_NAME = _ATOM + "name"
+_ARXIV_PUBLISHED = _ATOM + "published"
+
+
+@dataclass(slots=True)
+class Paper:
+    """
+    Schema bài báo dùng chung cho các nguồn (thứ tự trường = PAPER_FIELDS). Bản ghi gọn
+    (__slots__) cho nơi cần giữ nhiều bài trong bộ nhớ: Paper(*openalex_values(item)).
+    Pipeline làm việc với dict (record_dict), vì các stage sửa bài tại chỗ.
+    """
+    source: str
+    title: str
+    abstract: str
+    authors: str
+    link: str
+    citations: int
+    status: str
+    pub_date: str
+
+    def to_dict(self):
+        """Dict cùng khóa, cùng thứ tự khóa với kết quả cũ của các hàm search_*."""
+        return {
+            "source": self.source,
+            "title": self.title,
+            "abstract": self.abstract,
+            "authors": self.authors,
+            "link": self.link,
+            "citations": self.citations,
+            "status": self.status,
+            "pub_date": self.pub_date
+        }
+
+
+PAPER_FIELDS = tuple(f.name for f in fields(Paper))
+PUB_DATE = PAPER_FIELDS.index("pub_date")
+
+
+def record_dict(values):
+    """Dict bài báo (định dạng của các hàm search_*) từ tuple giá trị theo thứ tự PAPER_FIELDS."""
+    source, title, abstract, authors, link, citations, status, pub_date = values
+    return {
+        "source": source,
+        "title": title,
+        "abstract": abstract,
+        "authors": authors,
+        "link": link,
+        "citations": citations,
+        "status": status,
+        "pub_date": pub_date
+    }
+
+
+def _clean(text):
+    if text and isinstance(text, str):
+        return text.replace("\n", " ").strip()
+    return text
+
+
+# ========================
+# OpenAlex
+# ========================
+def decode_openalex_abstract(inverted_index):
+    """
+    Dựng lại abstract từ abstract_inverted_index {word: [positions]}.
+    Điền thẳng từng từ vào mảng cấp phát sẵn theo vị trí thay vì tạo và sort list (pos, word).
+
+    Parameters:
+        inverted_index (dict | None)
+
+    Returns:
+        str: abstract, hoặc "Not Available"
+    """
+    if not inverted_index:
+        return NOT_AVAILABLE
+    positions_list = inverted_index.values()
+    words = [None] * sum(map(len, positions_list))
+    try:
+        for word, positions in inverted_index.items():
+            for pos in positions:
+                words[pos] = word
+    except IndexError:
+        # Vị trí có khoảng trống (abstract bị cắt) -> cấp phát theo vị trí lớn nhất
+        words = [None] * (max(max(p) for p in positions_list if p) + 1)
+        for word, positions in inverted_index.items():
+            for pos in positions:
+                words[pos] = word
+    if None in words:
+        words = [w for w in words if w is not None]
+    return " ".join(words)
+
+
+def openalex_values(item):
+    """Giá trị (theo PAPER_FIELDS) của một work OpenAlex."""
+    get = item.get
+    authors = [a["author"]["display_name"] for a in get("authorships") or () if "author" in a]
+    return (
+        "OpenAlex",
+        get("title", "No title"),
+        _clean(decode_openalex_abstract(get("abstract_inverted_index"))),
+        ", ".join(authors) if authors else NOT_AVAILABLE,
+        (get("primary_location") or {}).get("landing_page_url", NOT_AVAILABLE),
+        get("cited_by_count", 0),
+        (get("open_access") or {}).get("status", NOT_AVAILABLE),
+        get("publication_date", NOT_AVAILABLE)
+    )
+
+
+# ========================
+# arXiv
+# ========================
+def arxiv_values(entry):
+    """Giá trị (theo PAPER_FIELDS) của một entry Atom arXiv."""
+    find = entry.find
+    authors = [a.find(_ARXIV_NAME).text for a in entry.iterfind(_ARXIV_AUTHOR)]
+    return (
+        "arXiv",
+        find(_ARXIV_TITLE).text.strip(),
+        find(_ARXIV_SUMMARY).text.strip(),
+        ", ".join(authors) if authors else NOT_AVAILABLE,
+        find(_ARXIV_ID).text.strip(),
+        0,
+        "Open Access",
+        find(_ARXIV_PUBLISHED).text[:10]
+    )
+
+
+# ========================
+# Crossref
+# ========================
+def crossref_values(item):
+    """Giá trị (theo PAPER_FIELDS) của một work Crossref."""
+    get = item.get
+    date_parts = (get("issued") or {}).get("date-parts", [[None]])
+    authors = []
+    for a in get("author") or ():
+        full_name = f"{a.get('given', '')} {a.get('family', '')}".strip()
+        if full_name:
+            authors.append(full_name)
+    doi = get("DOI", "")
+    return (
+        "Crossref",
+        get("title", ["No title"])[0],
+        _clean(get("abstract", NOT_AVAILABLE)),
+        ", ".join(authors) if authors else NOT_AVAILABLE,
+        f"https://doi.org/{doi}" if doi else NOT_AVAILABLE,
+        get("is-referenced-by-count", 0),
+        get("publisher", NOT_AVAILABLE),
+        "-".join([str(p) for p in date_parts[0] if p is not None])
+    )
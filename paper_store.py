@@ -0,0 +1,172 @@
+import json
+import os
+import re
+import sqlite3
+from datetime import datetime
+
+DATABASE_DIR = "database"
+STORE_FILE = "papers.sqlite"
+LEGACY_DATABASE_FILE = "papers_db.json"
+
+# Title ngắn (vd: "Editorial", "Preface") dễ trùng giữa các bài khác nhau -> không dùng làm khóa
+MIN_TITLE_KEY_LENGTH = 20
+
+_DOI_PATTERN = re.compile(r"10\.\d{4,9}/\S+", re.I)
+
+
+# ==============================
+# Chuẩn hóa khóa
+# ==============================
+def normalize_doi(value):
+    """Lấy DOI dạng 10.xxxx/yyy (lowercase) từ DOI thuần hoặc link doi.org."""
+    match = _DOI_PATTERN.search(value or "")
+    return match.group(0).rstrip(".,;").lower() if match else ""
+
+
+def normalize_link(value):
+    link = (value or "").strip().lower()
+    if link in ("", "not available"):
+        return ""
+    return link.rstrip("/")
+
+
+def normalize_title(value):
+    title = re.sub(r"[^\w\s]", " ", (value or "").lower())
+    title = " ".join(title.split())
+    return title if len(title) >= MIN_TITLE_KEY_LENGTH else ""
+
+
+def paper_keys(paper):
+    """(doi_key, link_key, title_key) của một bài báo; khóa không xác định là chuỗi rỗng."""
+    link = paper.get("link") or ""
+    doi = normalize_doi(paper.get("doi") or "") or normalize_doi(link if "doi.org" in link.lower() else "")
+    return doi, normalize_link(link), normalize_title(paper.get("title"))
+
+
+# ==============================
+# SQLite paper store
+# ==============================
+class PaperStore:
+    """
+    Database bài báo đã thu thập (SQLite, WAL) với unique index trên DOI / link / title
+    đã chuẩn hóa. Kiểm tra tồn tại và upsert đều đi qua index nên chi phí mỗi lần chạy
+    không tăng theo kích thước database.
+    """
+
+    def __init__(self, db_dir=DATABASE_DIR, db_file=STORE_FILE, legacy_file=LEGACY_DATABASE_FILE):
+        os.makedirs(db_dir, exist_ok=True)
+        self.path = os.path.join(db_dir, db_file)
+        self.conn = sqlite3.connect(self.path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS papers (
+                id INTEGER PRIMARY KEY,
+                title TEXT NOT NULL,
+                doi TEXT NOT NULL,
+                doi_key TEXT NOT NULL DEFAULT '',
+                link_key TEXT NOT NULL DEFAULT '',
+                title_key TEXT NOT NULL DEFAULT '',
+                added_at TEXT NOT NULL
+            );
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_papers_doi ON papers(doi_key) WHERE doi_key != '';
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_papers_link ON papers(link_key) WHERE link_key != '';
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_papers_title ON papers(title_key) WHERE title_key != '';
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            """
+        )
+        self.conn.commit()
+        self.migrate_from_json(os.path.join(db_dir, legacy_file))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Checkpoint WAL vào file chính (để commit được 1 file .sqlite) rồi đóng."""
+        self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self.conn.close()
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM papers").fetchone()[0]
+
+    def find(self, paper):
+        """Id của bản ghi trùng (theo DOI, link hoặc title đã chuẩn hóa) hoặc None."""
+        doi_key, link_key, title_key = paper_keys(paper)
+        for column, key in (("doi_key", doi_key), ("link_key", link_key), ("title_key", title_key)):
+            if key:
+                row = self.conn.execute(f"SELECT id FROM papers WHERE {column} = ?", (key,)).fetchone()
+                if row:
+                    return row[0]
+        return None
+
+    def contains(self, paper):
+        return self.find(paper) is not None
+
+    def iter_keys(self, latest=None):
+        """
+        Duyệt (doi_key, link_key, title_key) của mọi bản ghi (dùng để dựng dedup index),
+        hoặc chỉ của `latest` bản ghi được thêm gần nhất.
+        """
+        if latest is None:
+            yield from self.conn.execute("SELECT doi_key, link_key, title_key FROM papers")
+        else:
+            yield from self.conn.execute(
+                "SELECT doi_key, link_key, title_key FROM papers ORDER BY id DESC LIMIT ?", (latest,)
+            )
+
+    def upsert_many(self, papers):
+        """
+        Thêm các bài chưa có; bài đã có thì bổ sung khóa còn thiếu (vd: DOI mới biết).
+        Trả về số bài mới được thêm.
+        """
+        now = datetime.now().isoformat(timespec="seconds")
+        new_count = 0
+        with self.conn:
+            for paper in papers:
+                doi_key, link_key, title_key = paper_keys(paper)
+                if not (doi_key or link_key or title_key):
+                    continue
+                existing = self.find(paper)
+                if existing is None:
+                    self.conn.execute(
+                        "INSERT OR IGNORE INTO papers (title, doi, doi_key, link_key, title_key, added_at)"
+                        " VALUES (?, ?, ?, ?, ?, ?)",
+                        (paper.get("title", "Untitled"), paper.get("doi", paper.get("link", "")),
+                         doi_key, link_key, title_key, now)
+                    )
+                    new_count += 1
+                    continue
+                for column, key in (("doi_key", doi_key), ("link_key", link_key), ("title_key", title_key)):
+                    if key:
+                        try:
+                            self.conn.execute(
+                                f"UPDATE papers SET {column} = ? WHERE id = ? AND {column} = ''", (key, existing)
+                            )
+                        except sqlite3.IntegrityError:
+                            pass
+        return new_count
+
+    def migrate_from_json(self, json_path):
+        """Nhập database JSON cũ (papers_db.json) một lần duy nhất."""
+        done = self.conn.execute("SELECT value FROM meta WHERE key = 'migrated_json'").fetchone()
+        if done or not os.path.exists(json_path):
+            return 0
+        try:
+            with open(json_path, "r", encoding="utf-8") as f:
+                legacy = json.load(f)
+        except Exception as e:
+            print(f"❌ Lỗi khi đọc database cũ {json_path}: {e}")
+            return 0
+
+        # Trường "doi" của database cũ thực chất chứa link (doi.org hoặc landing page)
+        count = self.upsert_many({"title": item.get("title"), "doi": item.get("doi"), "link": item.get("doi")}
+                                 for item in legacy)
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('migrated_json', ?)",
+                              (datetime.now().isoformat(timespec="seconds"),))
+        print(f"📦 Đã chuyển {count} bài báo từ {json_path} sang {self.path}")
+        return count
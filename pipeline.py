@@ -0,0 +1,568 @@
+import json
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+
+from cache import make_key
+from checkpoint import CheckpointStore
+from entity_resolution import EntityResolver, is_missing, resolve_entities
+from http_client import get_http_cache_stats, get_http_stats
+from paper_store import paper_keys
+from scholar_search import run_scholar_search
+from search_api import (
+    search_openalex, search_arxiv, search_crossref,
+    DomainSlots, enrich_paper, filter_irrelevant_papers, summarize_filtered_papers,
+    FIRECRAWL_CONCURRENCY, RELEVANCE_BATCH_SIZE, SUMMARY_BATCH_SIZE,
+)
+from utils import filter_duplicates
+from watermarks import utc_now
+
+# Deadline (giây) cho từng nguồn, tính từ lúc bắt đầu fan-out
+SOURCE_TIMEOUTS = {
+    "OpenAlex": 90,
+    "arXiv": 90,
+    "Crossref": 90,
+    "Google Scholar": 900,
+}
+# Nguồn lọc được phía server theo high-water mark (Google Scholar luôn tìm đầy đủ nên không ghi mark)
+WATERMARK_SOURCES = ("OpenAlex", "arXiv", "Crossref")
+# Số bài mỗi lần checkpoint ở các stage theo từng bài
+CHECKPOINT_CHUNK = 10
+# Pipeline streaming: kích thước queue giữa các stage (backpressure) và thời gian tối đa
+# chờ gom đủ micro-batch trước khi gọi Gemini
+STREAM_QUEUE_SIZE = 50
+MICRO_BATCH_WAIT = 2.0
+
+
+# ========================
+# Chạy song song các nguồn tìm kiếm
+# ========================
+def _start_source(fn):
+    """
+    Chạy fn trong một daemon thread và trả về Future.
+    Dùng daemon thread (thay vì ThreadPoolExecutor) để nguồn bị quá hạn
+    không giữ tiến trình lại khi script kết thúc.
+    """
+    future = Future()
+
+    def target():
+        if not future.set_running_or_notify_cancel():
+            return
+        start = time.monotonic()
+        try:
+            papers = fn()
+            future.set_result((papers or [], time.monotonic() - start))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=target, daemon=True).start()
+    return future
+
+
+def search_tasks(keyword, max_results, watermarks=None, coverage=None):
+    """
+    Hàm tìm kiếm (không tham số) của từng nguồn. Có watermarks thì các API chỉ hỏi
+    bài mới kể từ lần chạy thành công trước (lọc phía server); Google Scholar không
+    có bộ lọc tương ứng nên luôn tìm như cũ.
+    coverage (dict): nếu có, coverage[nguồn]["oldest"] = ngày cũ nhất nguồn đó đã trả về
+    (xem iter_openalex), dùng để dời mark khi kết quả bị cắt ở max_results.
+    """
+    def since(source):
+        return watermarks.since(source, keyword) if watermarks else None
+
+    def covered(source):
+        return coverage.setdefault(source, {}) if coverage is not None else None
+
+    return {
+        "OpenAlex": lambda: search_openalex(query=keyword, rows=max_results, since=since("OpenAlex"),
+                                            coverage=covered("OpenAlex")),
+        "arXiv": lambda: search_arxiv(query=keyword, rows=max_results, since=since("arXiv"),
+                                      coverage=covered("arXiv")),
+        "Crossref": lambda: search_crossref(query=keyword, rows=max_results, since=since("Crossref"),
+                                            coverage=covered("Crossref")),
+        "Google Scholar": lambda: run_scholar_search(keyword, max_results),
+    }
+
+
+def _source_of(key):
+    return key[-1] if isinstance(key, tuple) else key
+
+
+def _label_of(key):
+    return " / ".join(key) if isinstance(key, tuple) else key
+
+
+def run_sources(tasks, on_result, timeouts=None):
+    """
+    Chạy đồng thời các hàm tìm kiếm; nguồn nào xong thì gọi on_result(key, papers) ngay
+    (ở thread gọi hàm). Nguồn quá deadline hoặc lỗi bị bỏ qua.
+
+    Parameters:
+        tasks (dict): {key: hàm không tham số}; key là tên nguồn hoặc (truy vấn, tên nguồn).
+        on_result (callable): Nhận (key, papers) của từng nguồn thành công.
+        timeouts (dict): Ghi đè deadline (giây) theo tên nguồn, tính từ lúc bắt đầu fan-out.
+
+    Returns:
+        dict: {nhãn: {"status", "seconds", "count", "retries", "failures"}}, nhãn là tên nguồn
+        hoặc "<truy vấn> / <nguồn>"; retries / failures là số HTTP của cả nguồn trong lần fan-out.
+    """
+    timeouts = {**SOURCE_TIMEOUTS, **(timeouts or {})}
+    http_before = get_http_stats()
+    start = time.monotonic()
+    pending = {key: _start_source(fn) for key, fn in tasks.items()}
+    sources = {_label_of(key): _source_of(key) for key in tasks}
+
+    stats = {}
+    while pending:
+        deadline = min(start + timeouts[_source_of(key)] for key in pending)
+        wait(list(pending.values()), timeout=max(0.0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+        for key, future in list(pending.items()):
+            label, name = _label_of(key), _source_of(key)
+            elapsed = round(time.monotonic() - start, 2)
+            if future.done():
+                del pending[key]
+                try:
+                    papers, seconds = future.result()
+                except Exception as e:
+                    stats[label] = {"status": "error", "seconds": elapsed, "count": 0}
+                    print(f"❌ Lỗi khi tìm kiếm {label}: {e}")
+                    continue
+                stats[label] = {"status": "ok", "seconds": round(seconds, 2), "count": len(papers)}
+                on_result(key, papers)
+            elif time.monotonic() >= start + timeouts[name]:
+                del pending[key]
+                stats[label] = {"status": "timeout", "seconds": elapsed, "count": 0}
+                print(f"⏱️ {label} quá hạn sau {timeouts[name]}s -> bỏ qua.")
+
+    http_after = get_http_stats()
+    for label, s in stats.items():
+        before, after = http_before.get(sources[label], {}), http_after.get(sources[label], {})
+        s["retries"] = after.get("retries", 0) - before.get("retries", 0)
+        s["failures"] = after.get("failures", 0) - before.get("failures", 0)
+        print(f"  {label}: {s['status']} - {s['count']} bài trong {s['seconds']}s "
+              f"(retries={s['retries']}, failures={s['failures']})")
+    print(f"🗃️ HTTP cache: {get_http_cache_stats()}")
+    print(f"⏱️ Tổng thời gian tìm kiếm: {time.monotonic() - start:.2f}s")
+    return stats
+
+
+def run_multi_searches(queries, max_results=30, timeouts=None, watermarks=None):
+    """
+    Gọi đồng thời mọi nguồn cho nhiều truy vấn (batch mode nhiều topic).
+
+    Parameters:
+        queries (list): Các từ khóa tìm kiếm.
+        max_results (int): Số bài tối đa mỗi nguồn, mỗi truy vấn.
+        timeouts (dict): Ghi đè deadline (giây) theo tên nguồn.
+        watermarks (Watermarks): Nếu có, chỉ tìm bài mới và ghi nhận mark cho (nguồn, truy vấn) thành công
+            (kết quả bị cắt ở max_results thì mark dời tới ngày cũ nhất được trả về).
+
+    Returns:
+        tuple: (danh sách bài báo đã hợp nhất trùng giữa các nguồn và các truy vấn,
+        thống kê {"<truy vấn> / <nguồn>": {"status", "seconds", "count", "retries", "failures"}}).
+    """
+    started_at = utc_now()
+    coverage = {query: {} for query in queries}
+    tasks = {
+        (query, name): fn
+        for query in queries
+        for name, fn in search_tasks(query, max_results, watermarks, coverage[query]).items()
+    }
+    merged_results = []
+
+    def collect(key, papers):
+        query, name = key
+        merged_results.extend(papers)
+        if watermarks and name in WATERMARK_SOURCES:
+            watermarks.mark(name, query, started_at, len(papers), max_results,
+                            coverage[query].get(name, {}).get("oldest"))
+
+    stats = run_sources(tasks, collect, timeouts)
+    return resolve_entities(merged_results), stats
+
+
+# ========================
+# Pipeline theo stage, có checkpoint để chạy tiếp khi bị dừng
+# ========================
+def item_key(paper):
+    """Khóa ổn định của bài báo trong checkpoint: DOI / link / title chuẩn hóa, hoặc hash nội dung."""
+    return next((k for k in paper_keys(paper) if k), "") or make_key(json.dumps(paper, sort_keys=True))
+
+
+class StagedPipeline:
+    """
+    Chạy các stage tuần tự, lưu output từng bài vào CheckpointStore sau mỗi chunk.
+    Chạy lại sau khi bị dừng (CI hết giờ, API lỗi) thì tiếp tục run dở: stage đã xong
+    được nạp lại từ checkpoint, stage dở chỉ xử lý các bài chưa xong.
+    """
+
+    def __init__(self, name, store=None, chunk_size=CHECKPOINT_CHUNK):
+        self.store = store or CheckpointStore()
+        self.chunk_size = chunk_size
+        self.run_id, resumed = self.store.resume_or_create(name)
+        print(f"🧭 {'Tiếp tục' if resumed else 'Bắt đầu'} run #{self.run_id} ({name})")
+
+    def run_once(self, stage, fn):
+        """Stage chạy một lần cho cả danh sách (vd: tìm kiếm); output được lưu nguyên khối."""
+        done = self.store.load_items(self.run_id, stage)
+        if "*" in done:
+            print(f"⏩ {stage}: dùng lại kết quả đã checkpoint")
+            return done["*"]
+        start = time.monotonic()
+        try:
+            output = fn()
+        except BaseException:
+            self.store.record_stage(self.run_id, stage, "failed", time.monotonic() - start, 0)
+            raise
+        self.store.save_items(self.run_id, stage, {"*": output})
+        items = len(output) if isinstance(output, list) else int(output is not None)
+        self.store.record_stage(self.run_id, stage, "done", time.monotonic() - start, items)
+        return output
+
+    def run_stage(self, stage, papers, fn, kind="map", chunk_size=None):
+        """
+        Chạy fn theo từng chunk trên các bài chưa xong ở stage.
+
+        Parameters:
+            stage (str): Tên stage.
+            papers (list): Input của stage.
+            fn (callable): Nhận list bài báo, trả về list (kind="map": cùng thứ tự, cùng độ dài;
+                kind="filter": danh sách con các dict được giữ lại).
+            kind (str): "map" hoặc "filter".
+            chunk_size (int): Số bài mỗi lần checkpoint (None = mặc định của pipeline).
+
+        Returns:
+            list: Output của stage theo thứ tự input (bài bị loại không có mặt).
+        """
+        keys = list(dict.fromkeys(item_key(p) for p in papers))
+        by_key = {item_key(p): p for p in papers}
+        done = self.store.load_items(self.run_id, stage)
+        todo = [by_key[k] for k in keys if k not in done]
+        if len(todo) < len(keys):
+            print(f"⏩ {stage}: bỏ qua {len(keys) - len(todo)} bài đã xong")
+
+        size = max(1, chunk_size or self.chunk_size)
+        start = time.monotonic()
+        try:
+            for i in range(0, len(todo), size):
+                chunk = todo[i:i + size]
+                output = fn(chunk)
+                if kind == "filter":
+                    kept = {id(p) for p in output}
+                    outputs = {item_key(p): (p if id(p) in kept else None) for p in chunk}
+                else:
+                    outputs = {item_key(p): o for p, o in zip(chunk, output)}
+                self.store.save_items(self.run_id, stage, outputs)
+                done.update(outputs)
+        except BaseException:
+            self.store.record_stage(self.run_id, stage, "failed", time.monotonic() - start, len(done))
+            raise
+        results = [done[k] for k in keys if done.get(k) is not None]
+        self.store.record_stage(self.run_id, stage, "done", time.monotonic() - start, len(results))
+        return results
+
+    def finish(self):
+        """Đánh dấu run hoàn thành và in thời gian từng stage. Trả về thống kê stage."""
+        self.store.finish_run(self.run_id)
+        stats = self.store.stage_stats(self.run_id)
+        for stage, s in stats.items():
+            print(f"  {stage}: {s['status']} - {s['items']} bài, {s['seconds']}s")
+        return stats
+
+
+# ========================
+# Pipeline streaming: bài báo chảy qua các stage ngay khi được tạo ra
+# ========================
+_END = object()
+
+
+def _restore(paper, saved):
+    """Nạp output đã checkpoint vào chính dict đang chảy trong pipeline (giữ nguyên object)."""
+    for field, value in saved.items():
+        if is_missing(paper.get(field)):
+            paper[field] = value
+    return paper
+
+
+class DropTracker:
+    """
+    Đưa lại vào pipeline bài đã bị stage sau loại (vd: lọc liên quan loại vì chưa có abstract)
+    khi EntityResolver tìm được trường còn thiếu ở bản ghi trùng đến sau. Trường bổ sung chỉ
+    được điền (không ghi đè) khi bài không còn ở stage nào, nên không tranh ghi với stage:
+    - bài đã bị loại trước đó -> điền ngay, take_recovered() để stage lọc trùng đẩy lại;
+    - bài đang ở stage sau -> giữ lại; nếu stage đó loại bài thì take_updated() điền rồi
+      stage xử lý lại một lần. Bài đi hết pipeline nhận phần gộp qua apply_merges().
+    """
+
+    def __init__(self):
+        self.recovered = 0
+        self._dropped = {}
+        self._updated = {}
+        self._pending = []
+        self._lock = threading.Lock()
+
+    def updated(self, paper, fills):
+        """Callback on_update của EntityResolver."""
+        with self._lock:
+            if self._dropped.pop(id(paper), None) is not None:
+                self._pending.append(_restore(paper, fills))
+                self.recovered += 1
+            else:
+                pending = self._updated.setdefault(id(paper), {})
+                for field, value in fills.items():
+                    pending.setdefault(field, value)
+
+    def dropped(self, papers):
+        with self._lock:
+            for paper in papers:
+                self._dropped[id(paper)] = paper
+
+    def take_recovered(self):
+        with self._lock:
+            papers, self._pending = self._pending, []
+        return papers
+
+    def take_updated(self, papers):
+        """Trong các bài vừa bị loại, những bài có dữ liệu bổ sung kể từ khi vào pipeline (đã được điền)."""
+        with self._lock:
+            return [_restore(paper, self._updated.pop(id(paper))) for paper in papers if id(paper) in self._updated]
+
+
+class StreamStage:
+    """
+    Một stage của pipeline streaming: `workers` thread đọc micro-batch từ inbox (queue có
+    giới hạn -> stage trước bị chặn khi stage này chậm), gọi fn và đẩy output sang stage sau.
+
+    fn nhận list bài báo và trả về list (kind="map": cùng thứ tự; kind="filter": danh sách
+    con được giữ lại). Nếu có checkpoint (StagedPipeline), bài đã xong ở stage được bỏ qua
+    và output từng micro-batch được lưu lại. Nếu có tracker (DropTracker), bài bị loại được
+    báo lại để có thể đưa vào pipeline lần nữa.
+    """
+
+    def __init__(self, name, fn, kind="map", batch_size=1, workers=1, queue_size=STREAM_QUEUE_SIZE,
+                 checkpoint=None, tracker=None):
+        self.name = name
+        self.fn = fn
+        self.kind = kind
+        self.batch_size = max(1, batch_size)
+        self.workers = max(1, workers)
+        self.inbox = queue.Queue(maxsize=queue_size)
+        self.downstream = None
+        self.checkpoint = checkpoint
+        self.tracker = tracker
+        self.done = checkpoint.store.load_items(checkpoint.run_id, name) if checkpoint else {}
+        self.stats = {"in": 0, "out": 0, "busy_seconds": 0.0}
+        self.results = []
+        self._active = self.workers
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def put(self, paper):
+        self.inbox.put(paper)
+
+    def close(self):
+        for _ in range(self.workers):
+            self.inbox.put(_END)
+
+    def _emit(self, papers):
+        with self._lock:
+            self.stats["out"] += len(papers)
+            if self.downstream is None:
+                self.results.extend(papers)
+        if self.downstream is not None:
+            for paper in papers:
+                self.downstream.put(paper)
+
+    def _next_batch(self):
+        """Chờ phần tử đầu, gom thêm tới batch_size hoặc hết MICRO_BATCH_WAIT giây. Trả về (batch, ended)."""
+        item = self.inbox.get()
+        if item is _END:
+            return [], True
+        batch = [item]
+        deadline = time.monotonic() + MICRO_BATCH_WAIT
+        while len(batch) < self.batch_size:
+            try:
+                item = self.inbox.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if item is _END:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def forget(self, paper):
+        """Bỏ kết quả checkpoint của bài (bài được đưa lại vào pipeline với dữ liệu mới)."""
+        for key in [*paper_keys(paper), item_key(paper)]:
+            if key:
+                self.done.pop(key, None)
+
+    def _run(self, papers):
+        """Gọi fn và lưu checkpoint. Trả về (output, các bài bị loại hoặc lỗi)."""
+        start = time.monotonic()
+        try:
+            output = list(self.fn(papers))
+        except Exception as e:
+            print(f"❌ Stage {self.name} lỗi với {len(papers)} bài: {e}")
+            return [], list(papers)
+        finally:
+            with self._lock:
+                self.stats["busy_seconds"] += time.monotonic() - start
+        if self.kind == "filter":
+            kept = {id(p) for p in output}
+            dropped = [p for p in papers if id(p) not in kept]
+            outputs = {item_key(p): (p if id(p) in kept else None) for p in papers}
+        else:
+            dropped = []
+            outputs = {item_key(p): o for p, o in zip(papers, output)}
+        if self.checkpoint:
+            self.checkpoint.store.save_items(self.checkpoint.run_id, self.name, outputs)
+        return output, dropped
+
+    def _process(self, batch):
+        with self._lock:
+            self.stats["in"] += len(batch)
+        replay, dropped, todo = [], [], []
+        for paper in batch:
+            key = item_key(paper)
+            if key not in self.done:
+                todo.append(paper)
+            elif self.done[key] is None:
+                dropped.append(paper)
+            else:
+                replay.append(_restore(paper, self.done[key]))
+        output = []
+        if todo:
+            output, failed = self._run(todo)
+            dropped += failed
+        if self.tracker is not None and dropped:
+            retry = self.tracker.take_updated(dropped)
+            if retry:
+                print(f"🔁 {self.name}: xử lý lại {len(retry)} bài vừa được bổ sung dữ liệu")
+                retried = {id(p) for p in retry}
+                more, failed = self._run(retry)
+                output += more
+                dropped = [p for p in dropped if id(p) not in retried] + failed
+            self.tracker.dropped(dropped)
+        self._emit(replay + output)
+
+    def _worker(self):
+        try:
+            ended = False
+            while not ended:
+                batch, ended = self._next_batch()
+                if batch:
+                    self._process(batch)
+        finally:
+            with self._lock:
+                self._active -= 1
+                last = self._active == 0
+            if last and self.downstream is not None:
+                self.downstream.close()
+
+    def start(self):
+        for _ in range(self.workers):
+            thread = threading.Thread(target=self._worker, daemon=True, name=f"stage-{self.name}")
+            thread.start()
+            self._threads.append(thread)
+
+    def join(self):
+        for thread in self._threads:
+            thread.join()
+
+
+def stream_pipeline(keyword, max_results=30, timeouts=None, checkpoint=None, keywords=None, watermarks=None):
+    """
+    Tìm kiếm -> lọc trùng -> bổ sung abstract -> lọc liên quan -> tóm tắt theo kiểu streaming:
+    kết quả của nguồn xong trước (OpenAlex, arXiv, Crossref) đi tiếp ngay trong khi
+    Google Scholar còn đang chạy; các stage Gemini gom micro-batch. Tổng thời gian xấp xỉ
+    stage chậm nhất thay vì tổng các stage.
+
+    Parameters:
+        keyword (str): Từ khóa tìm kiếm.
+        max_results (int): Số bài tối đa mỗi nguồn.
+        timeouts (dict): Ghi đè deadline (giây) theo tên nguồn.
+        checkpoint (StagedPipeline): Nếu có, lưu / dùng lại tiến độ theo từng bài.
+        keywords (list): Chủ đề để lọc liên quan (None = mặc định của filter_irrelevant_papers).
+        watermarks (Watermarks): Nếu có, chỉ tìm bài mới từ lần chạy trước và ghi nhận mark
+            cho nguồn thành công - tới ngày cũ nhất được trả về nếu kết quả bị cắt ở max_results
+            (gọi watermarks.commit() sau khi lưu kết quả).
+
+    Returns:
+        tuple: (danh sách bài báo đã tóm tắt, thống kê {"sources", "stages", "seconds", "merged_duplicates", "recovered"}).
+    """
+    relevance_kwargs = {"keywords": keywords} if keywords else {}
+    tracker = DropTracker()
+    resolver = EntityResolver(on_update=tracker.updated)
+    domain_slots = DomainSlots()
+
+    def dedup(papers):
+        unique = filter_duplicates([p for p in papers if resolver.add(p) is not None])
+        # Bài đã bị loại ở stage sau nhưng vừa được bổ sung abstract / link từ bản trùng -> đi lại từ enrich
+        recovered = tracker.take_recovered()
+        for paper in recovered:
+            print(f"♻️ Đưa lại vào pipeline: {(paper.get('title') or '')[:80]}")
+            for stage in stages[1:]:
+                stage.forget(paper)
+        return unique + recovered
+
+    stages = [
+        StreamStage("dedup", dedup, kind="filter", batch_size=RELEVANCE_BATCH_SIZE),
+        StreamStage("enrich", lambda papers: [enrich_paper(p, domain_slots) for p in papers],
+                    workers=FIRECRAWL_CONCURRENCY, checkpoint=checkpoint, tracker=tracker),
+        StreamStage("relevance", lambda papers: filter_irrelevant_papers(papers, **relevance_kwargs), kind="filter",
+                    batch_size=RELEVANCE_BATCH_SIZE, checkpoint=checkpoint, tracker=tracker),
+        StreamStage("summary", summarize_filtered_papers, batch_size=SUMMARY_BATCH_SIZE, checkpoint=checkpoint,
+                    tracker=tracker),
+    ]
+    for stage, nxt in zip(stages, stages[1:]):
+        stage.downstream = nxt
+    for stage in stages:
+        stage.start()
+
+    # Nguồn nào xong thì đẩy kết quả vào stage đầu (bị chặn nếu queue đầy)
+    start = time.monotonic()
+    started_at = utc_now()
+    source_stats = {}
+    done_sources = checkpoint.store.load_items(checkpoint.run_id, "search") if checkpoint else {}
+    tasks = {}
+    coverage = {}
+    for name, fn in search_tasks(keyword, max_results, watermarks, coverage).items():
+        if name in done_sources:
+            source_stats[name] = {"status": "checkpoint", "seconds": 0.0, "count": len(done_sources[name])}
+            for paper in done_sources[name]:
+                stages[0].put(paper)
+        else:
+            tasks[name] = fn
+
+    def push(name, papers):
+        print(f"📥 {name}: {len(papers)} bài -> đưa vào pipeline")
+        if checkpoint:
+            checkpoint.store.save_items(checkpoint.run_id, "search", {name: papers})
+        if watermarks and name in WATERMARK_SOURCES:
+            watermarks.mark(name, keyword, started_at, len(papers), max_results,
+                            coverage.get(name, {}).get("oldest"))
+        for paper in papers:
+            stages[0].put(paper)
+
+    source_stats.update(run_sources(tasks, push, timeouts))
+
+    stages[0].close()
+    for stage in stages:
+        stage.join()
+    resolver.apply_merges(stages[-1].results)
+
+    stats = {
+        "sources": source_stats,
+        "stages": {stage.name: {**stage.stats, "busy_seconds": round(stage.stats["busy_seconds"], 2)}
+                   for stage in stages},
+        "seconds": round(time.monotonic() - start, 2),
+        "merged_duplicates": resolver.merged,
+        "recovered": tracker.recovered,
+    }
+    for name, s in stats["stages"].items():
+        print(f"  {name}: {s['in']} vào, {s['out']} ra, bận {s['busy_seconds']}s")
+        if checkpoint:
+            checkpoint.store.record_stage(checkpoint.run_id, name, "done", s["busy_seconds"], s["out"])
+    print(f"⏱️ Pipeline streaming xong sau {stats['seconds']}s")
+    return stages[-1].results, stats
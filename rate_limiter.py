@@ -0,0 +1,115 @@
+import os
+import threading
+import time
+
+# Quota mặc định (request/phút) theo provider, ghi đè bằng biến môi trường <PROVIDER>_RPM
+DEFAULT_RPM = {
+    "gemini": 10,
+    "firecrawl": 10,
+}
+
+
+class TokenBucket:
+    """
+    Token bucket dùng chung giữa các thread, cấu hình theo request/phút.
+
+    - acquire() chặn đến khi có token, trả về số giây đã chờ.
+    - on_rate_limited() được gọi khi gặp 429: giảm một nửa tốc độ và tạm dừng
+      theo Retry-After (nếu có).
+    - on_success() tăng dần tốc độ trở lại mức cấu hình.
+    """
+
+    def __init__(self, rpm, burst=1, min_rpm=1):
+        self.max_rate = rpm / 60.0
+        self.min_rate = min(min_rpm, rpm) / 60.0
+        self.rate = self.max_rate
+        self.capacity = max(1, burst)
+        self.waited = 0.0
+        self.throttled = 0
+        self._tokens = float(self.capacity)
+        self._last = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def rpm(self):
+        return self.rate * 60.0
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def acquire(self):
+        """Giữ chỗ 1 token rồi ngủ (ngoài lock) cho tới lượt của mình."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= 1
+            wait = max(self._blocked_until - now, -self._tokens / self.rate if self._tokens < 0 else 0.0)
+            self.waited += wait
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def on_rate_limited(self, retry_after=None):
+        with self._lock:
+            self._refill(time.monotonic())
+            self.throttled += 1
+            self.rate = max(self.min_rate, self.rate / 2)
+            if retry_after:
+                self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+
+    def on_success(self):
+        with self._lock:
+            if self.rate < self.max_rate:
+                self._refill(time.monotonic())
+                self.rate = min(self.max_rate, self.rate + self.max_rate / 10)
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(provider):
+    """Trả về TokenBucket dùng chung cho provider (tạo mới ở lần gọi đầu)."""
+    with _limiters_lock:
+        limiter = _limiters.get(provider)
+        if limiter is None:
+            rpm = float(os.getenv(f"{provider.upper()}_RPM", DEFAULT_RPM.get(provider, 60)))
+            limiter = TokenBucket(rpm)
+            _limiters[provider] = limiter
+        return limiter
+
+
+def get_rate_limit_stats():
+    """Tốc độ hiện tại, tổng thời gian chờ và số lần bị 429 theo provider."""
+    with _limiters_lock:
+        return {
+            provider: {
+                "rpm": round(limiter.rpm, 2),
+                "waited_seconds": round(limiter.waited, 2),
+                "throttled": limiter.throttled,
+            }
+            for provider, limiter in _limiters.items()
+        }
+
+
+class DomainThrottle:
+    """
+    Giãn cách tối thiểu min_interval giây giữa hai request tới cùng một domain
+    (dùng chung giữa các thread, các domain khác nhau không chặn nhau).
+    """
+
+    def __init__(self, min_interval):
+        self.min_interval = min_interval
+        self._next = {}
+        self._lock = threading.Lock()
+
+    def wait(self, domain):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next.get(domain, now))
+            self._next[domain] = slot + self.min_interval
+        if slot > now:
+            time.sleep(slot - now)
+        return slot - now
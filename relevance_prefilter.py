@@ -0,0 +1,160 @@
+import re
+
+import numpy as np
+
+# BM25: độ bão hòa tần suất (k1) và chuẩn hóa độ dài abstract (b)
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Từ đồng nghĩa / kỹ thuật con của chủ đề, được tính với trọng số thấp hơn từ khóa gốc
+EXPANSION_WEIGHT = 0.5
+TOPIC_EXPANSIONS = {
+    "non-destructive testing": [
+        "NDT", "NDE", "non-destructive", "nondestructive evaluation", "non-destructive inspection",
+        "ultrasonic", "ultrasound", "eddy current", "radiography", "thermography", "acoustic emission",
+        "phased array", "guided wave", "computed tomography", "X-ray", "defect", "crack", "corrosion",
+        "damage detection", "flaw detection", "structural health monitoring", "SHM",
+    ],
+}
+# Từ đơn quá chung chung (test, detection, monitoring...): không dùng làm term riêng lẻ
+GENERIC_TERMS = {
+    "test", "testing", "detection", "monitoring", "inspection", "evaluation", "analysis",
+    "assessment", "health", "current", "wave", "method", "system", "measurement", "sensor",
+}
+# Ngưỡng hiệu chỉnh trên mẫu trong results/ + database/ (gán nhãn tay) và vài abstract lạc đề
+# (COVID antigen testing, eddy current trong motor, guided wave quang học):
+# - bài liên quan thấp nhất 0.32, bài lạc đề có khớp từ khóa gốc cao nhất 0.63
+# - tính cả bài dùng gạch nối Unicode của Crossref ("Non‐destructive", U+2010): bài trứng cút
+#   trong results/2025-10-05 đạt 0.95
+# Từ ngưỡng này (và có khớp cụm từ khóa gốc) giữ luôn, không gọi Gemini
+ACCEPT_AT = 0.8
+# Dưới ngưỡng này coi như chắc chắn không liên quan (không gọi Gemini). Chỉ áp dụng cho chủ đề
+# có từ mở rộng trong TOPIC_EXPANSIONS (đã hiệu chỉnh ở trên); chủ đề khác (vd "Structural Health
+# Monitoring", "Ultrasonic Testing" trong topics.json) chỉ khớp nguyên cụm từ khóa nên bài liên quan
+# diễn đạt khác ("SHM of bridges", "phased array ultrasound") cũng ra 0 -> để Gemini quyết định.
+REJECT_BELOW = 0.1
+
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is", "it",
+    "of", "on", "or", "that", "the", "this", "to", "was", "were", "with",
+}
+_SUFFIXES = ("ing", "ed", "es", "s")
+# Gạch nối / gạch ngang Unicode (U+2010..U+2015, dấu trừ U+2212) mà Crossref hay dùng thay "-"
+_DASHES = re.compile(r"[\u2010-\u2015\u2212-]")
+
+
+def _stem(word):
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 4:
+            return word[:-len(suffix)]
+    return word
+
+
+def tokenize(text):
+    """
+    Lowercase, nối từ có gạch nối (mọi loại gạch, vd "non‐destructive" với U+2010) và
+    tiền tố "non" (non-destructive / non destructive -> nondestructive), bỏ stopword, stem nhẹ.
+    """
+    text = _DASHES.sub("-", (text or "").lower())
+    text = re.sub(r"(?<=[a-z])-(?=[a-z])", "", text)
+    text = re.sub(r"\bnon\s+(?=[a-z])", "non", text)
+    return [_stem(w) for w in re.findall(r"[a-z0-9]+", text) if w not in _STOPWORDS]
+
+
+_GENERIC_STEMS = {_stem(term) for term in GENERIC_TERMS}
+
+
+def query_weights(keywords):
+    """
+    Cụm từ (tuple token) -> trọng số: từ khóa gốc 1.0, cụm mở rộng của chủ đề EXPANSION_WEIGHT.
+    Mỗi từ khóa / cụm mở rộng được so khớp nguyên cụm; cụm chỉ gồm một từ chung chung bị bỏ.
+    """
+    weights = {}
+    for keyword in keywords:
+        phrase = tuple(tokenize(keyword))
+        if phrase and not (len(phrase) == 1 and phrase[0] in _GENERIC_STEMS):
+            weights[phrase] = 1.0
+        for expansion in TOPIC_EXPANSIONS.get(keyword.lower(), []):
+            phrase = tuple(tokenize(expansion))
+            if phrase and not (len(phrase) == 1 and phrase[0] in _GENERIC_STEMS):
+                weights.setdefault(phrase, EXPANSION_WEIGHT)
+    return weights
+
+
+def _phrase_counts(tokens, phrases_by_first):
+    """Số lần xuất hiện (liền nhau) của từng cụm trong dãy token: {cột: số lần}."""
+    counts = {}
+    for i, token in enumerate(tokens):
+        for phrase, j in phrases_by_first.get(token, ()):
+            if tuple(tokens[i:i + len(phrase)]) == phrase:
+                counts[j] = counts.get(j, 0) + 1
+    return counts
+
+
+def _score(texts, keywords):
+    """(điểm [0, 1], mảng bool "có khớp ít nhất một cụm từ khóa gốc") của từng văn bản."""
+    weights = query_weights(keywords)
+    if not texts or not weights:
+        return np.zeros(len(texts)), np.zeros(len(texts), dtype=bool)
+    phrases = list(weights)
+    phrases_by_first = {}
+    for j, phrase in enumerate(phrases):
+        phrases_by_first.setdefault(phrase[0], []).append((phrase, j))
+
+    counts = np.zeros((len(texts), len(phrases)), dtype=np.float32)
+    lengths = np.zeros(len(texts), dtype=np.float32)
+    for i, text in enumerate(texts):
+        tokens = tokenize(text)
+        lengths[i] = len(tokens)
+        for j, count in _phrase_counts(tokens, phrases_by_first).items():
+            counts[i, j] = count
+
+    norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths / max(float(lengths.mean()), 1.0))
+    saturation = counts / (counts + norm[:, None])  # [0, 1)
+    w = np.array([weights[p] for p in phrases], dtype=np.float32)
+    is_keyword = w >= 1.0
+    base_total = float(w[is_keyword].sum()) or float(w.sum())
+    scores = np.clip(saturation @ w / base_total, 0.0, 1.0)
+    return scores, (counts[:, is_keyword] > 0).any(axis=1)
+
+
+def score_relevance(texts, keywords):
+    """
+    Điểm liên quan trong [0, 1] của từng văn bản (title + abstract) với chủ đề.
+
+    Mỗi cụm từ của truy vấn đóng góp trọng số x độ bão hòa BM25 của số lần cụm xuất hiện
+    (chuẩn hóa theo độ dài); tổng được chia cho tổng trọng số của từ khóa gốc, nên
+    văn bản nhắc lặp lại toàn bộ từ khóa gốc tiến gần 1, không nhắc cụm nào = 0.
+
+    Parameters:
+        texts (list): Danh sách văn bản cần chấm điểm.
+        keywords (list): Từ khóa chủ đề.
+
+    Returns:
+        numpy.ndarray: Mảng điểm, cùng thứ tự với texts.
+    """
+    return _score(texts, keywords)[0]
+
+
+def is_calibrated(keywords):
+    """Chủ đề có từ mở rộng (đã hiệu chỉnh REJECT_BELOW) hay không."""
+    return any(keyword.lower() in TOPIC_EXPANSIONS for keyword in keywords)
+
+
+def split_by_relevance(texts, keywords, accept_at, reject_below=REJECT_BELOW):
+    """
+    Chia chỉ số văn bản thành 3 nhóm theo điểm: (accepted, rejected, uncertain, scores).
+    Chỉ giữ luôn khi điểm >= accept_at VÀ văn bản chứa nguyên cụm một từ khóa gốc
+    (chỉ khớp từ mở rộng thì vẫn hỏi LLM). Chỉ loại luôn khi chủ đề đã hiệu chỉnh
+    (is_calibrated); chủ đề khác không loại bài nào. Chỉ nhóm uncertain cần hỏi LLM.
+    """
+    scores, keyword_hit = _score(texts, keywords)
+    reject_below = min(reject_below, accept_at)
+    is_accepted = (scores >= accept_at) & keyword_hit
+    if is_calibrated(keywords):
+        is_rejected = scores < reject_below
+    else:
+        is_rejected = np.zeros(len(scores), dtype=bool)
+    accepted = np.flatnonzero(is_accepted).tolist()
+    rejected = np.flatnonzero(is_rejected).tolist()
+    uncertain = np.flatnonzero(~is_accepted & ~is_rejected).tolist()
+    return accepted, rejected, uncertain, scores
@@ -1,7 +1,7 @@
-from scholar_search import run_scholar_search
-from search_api import search_openalex,  search_arxiv, search_crossref,enrich_with_firecrawl, summarize_filtered_papers, filter_irrelevant_papers
+from pipeline import StagedPipeline, stream_pipeline
 from dotenv import load_dotenv
-from utils import filter_duplicates, save_results_to_json, save_results_to_database
+from utils import save_results_to_json, save_results_to_database
+from watermarks import Watermarks
 import os
 
 
@@ -22,42 +22,32 @@ keyword_tab1 = "Non-Destructive Testing"
 max_results_tab1 = 30
 
 
-# 1. Gọi các API
-openalex_res = search_openalex(query=keyword_tab1, rows=max_results_tab1)
-arxiv_res = search_arxiv(query=keyword_tab1, rows=max_results_tab1)
-crossref_res = search_crossref(query=keyword_tab1, rows=max_results_tab1)
+# Mỗi stage lưu checkpoint theo từng bài: chạy lại sau khi bị dừng sẽ tiếp tục run dở
+pipeline = StagedPipeline(f"run_{keyword_tab1.replace(' ', '_')}")
 
-# Google Scholar
-scholar_data = run_scholar_search(keyword_tab1, max_results_tab1)
+# High-water mark theo nguồn: các API chỉ trả bài mới kể từ lần chạy thành công trước
+watermarks = Watermarks(DATABASE_DIR)
 
-# 2. Hợp nhất kết quả
-merged_results = []
-for res in [openalex_res, arxiv_res, crossref_res, scholar_data]:
-    merged_results.extend(res)
+# 1-6. Tìm kiếm -> lọc trùng -> bổ sung abstract -> lọc liên quan -> tóm tắt (streaming):
+# bài của nguồn xong trước đi qua các stage sau ngay, không chờ Google Scholar
+summarized_results, stream_stats = stream_pipeline(keyword_tab1, max_results_tab1, checkpoint=pipeline,
+                                                   watermarks=watermarks)
 
-# 3. Lọc trùng 
-print("⏳ Đang lọc bài báo trùng...")
-unique_results = filter_duplicates(merged_results)
-
-# 4. Crawl abstract bổ sung bằng Firecrawl
-print("⏳ Đang bổ sung abstract...")
-enriched_results = enrich_with_firecrawl(unique_results)
-
-# 5. Lọc bài không liên quan
-print("⏳ Đang lọc bài không liên quan...")
-filtered_results = filter_irrelevant_papers(enriched_results)
-
-# 6. Tóm tắt abstract
-print("⏳ Đang tóm tắt abstract...")
-summarized_results = summarize_filtered_papers(filtered_results)
 
 # 7. Lưu kết quả
-saved_file = save_results_to_json(
-    summarized_results,
-    output_dir=RESULTS_DIR,
-    prefix=f"allapi_scholar_{keyword_tab1.replace(' ', '_')}"
-)
-if saved_file:
-    save_results_to_database(saved_file)
-
-print(f"✅ Đã lưu kết quả enriched vào: {saved_file}")
\ No newline at end of file
+def save(papers):
+    result_file = save_results_to_json(
+        papers,
+        output_dir=RESULTS_DIR,
+        prefix=f"allapi_scholar_{keyword_tab1.replace(' ', '_')}"
+    )
+    if result_file:
+        save_results_to_database(result_file)
+    return result_file
+
+
+saved_file = pipeline.run_once("save", lambda: save(summarized_results))
+watermarks.commit()
+pipeline.finish()
+
+print(f"✅ Đã lưu kết quả enriched vào: {saved_file}")
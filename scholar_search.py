@@ -2,37 +2,261 @@ import os
 import json
 import re
 import time
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import List, Dict
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+import requests
+from bs4 import BeautifulSoup
 from selenium import webdriver
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
+import http_client
+from browser_manager import get_browser_manager
+from rate_limiter import DomainThrottle
+
+# Số trình duyệt headless mở song song để lấy trang chi tiết
+SCHOLAR_DETAIL_WORKERS = int(os.getenv("SCHOLAR_DETAIL_WORKERS", 3))
+# Giãn cách tối thiểu (giây) giữa hai lần mở trang của cùng một domain
+SCHOLAR_DOMAIN_INTERVAL = float(os.getenv("SCHOLAR_DOMAIN_INTERVAL", 3))
+PAGE_READY_TIMEOUT = 10
+# Số trang kết quả Scholar tối đa (10 bài / trang)
+SCHOLAR_MAX_PAGES = int(os.getenv("SCHOLAR_MAX_PAGES", 10))
+SCHOLAR_HOST = "scholar.google.com"
+
+# Title selectors
+TITLE_SELECTORS = [
+    "h1", "h2", ".title", "#title",
+    "h1[class*='title']", "h2[class*='title']",
+    ".paper-title", ".article-title",
+    ".entry-title", ".post-title"
+]
+
+# Abstract selectors
+ABSTRACT_SELECTORS = [
+    ".abstract", "#abstract", "[class*='abstract']",
+    ".summary", "#summary", "[class*='summary']",
+    "p[class*='abstract']", "div[class*='abstract']",
+    ".paper-abstract", ".article-abstract",
+    "section[class*='abstract']", "[id*='abstract']"
+]
+
+ABSTRACT_HINTS = ['abstract', 'this paper', 'this study', 'we present', 'we propose']
+
+# Meta tag (Highwire / Dublin Core / Open Graph) mà đa số nhà xuất bản cung cấp
+TITLE_META = ["citation_title", "dc.title", "og:title"]
+ABSTRACT_META = ["citation_abstract", "dc.description", "dcterms.abstract"]
+
+HTTP_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) "
+                  "Chrome/124.0 Safari/537.36",
+    "Accept-Language": "en-US,en;q=0.9",
+}
 
 def get_target_date(days_ago=1):
     """Lấy ngày YYYY-MM-DD của hôm qua (hoặc n ngày trước)"""
     target_date = datetime.now() - timedelta(days=days_ago)
     return target_date.strftime("%Y")
+
+
+def create_driver():
+    """Tạo Chrome headless với các tùy chọn an toàn"""
+    options = Options()
+    options.add_argument("--headless=new")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument('--disable-blink-features=AutomationControlled')
+    options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    options.add_experimental_option('useAutomationExtension', False)
+
+    driver = webdriver.Chrome(options=options)
+    driver.set_page_load_timeout(60)
+    driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+    return driver
+
+
+def scholar_page_url(current_url, start):
+    """URL trang kết quả Scholar với offset start=, luôn ở chế độ sắp xếp theo ngày (scisbd=1)."""
+    parts = urlsplit(current_url)
+    query = dict(parse_qsl(parts.query))
+    query["start"] = str(start)
+    query["scisbd"] = "1"
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def is_older_than(pub_date, date):
+    """pub_date (YYYY hoặc YYYY-MM-DD) cũ hơn date? So theo độ dài chung của hai chuỗi."""
+    if not date or pub_date == "Not Available":
+        return False
+    n = min(len(pub_date), len(date))
+    return pub_date[:n] < date[:n]
+
+
+_throttle = None
+_throttle_lock = threading.Lock()
+
+
+def get_scholar_throttle():
+    """
+    DomainThrottle dùng chung cho mọi ScholarFinder trong tiến trình: nhiều topic tìm
+    song song vẫn chỉ có một nhịp request tới scholar.google.com (và từng domain chi tiết).
+    """
+    global _throttle
+    with _throttle_lock:
+        if _throttle is None:
+            _throttle = DomainThrottle(SCHOLAR_DOMAIN_INTERVAL)
+        return _throttle
+
+
+def get_scholar_browsers():
+    """Pool Chrome headless dùng chung (giữ ấm giữa các lần tìm kiếm)."""
+    return get_browser_manager(create_driver)
+
+
+def wait_until_ready(driver, timeout=PAGE_READY_TIMEOUT):
+    """
+    Chờ trang load xong (document.readyState == complete) và có title/abstract
+    được render, thay cho time.sleep cố định. Hết timeout thì vẫn tiếp tục.
+    """
+    try:
+        WebDriverWait(driver, timeout).until(
+            lambda d: d.execute_script("return document.readyState") == "complete"
+        )
+        WebDriverWait(driver, timeout / 2).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, "h1, [class*='abstract'], [id*='abstract']"))
+        )
+    except TimeoutException:
+        pass
+
+
+def extract_details(driver):
+    """Lấy title và abstract từ trang bài báo đang mở trong driver."""
+    title = "Not Available"
+    abstract = "Not Available"
+
+    for selector in TITLE_SELECTORS:
+        try:
+            title_element = driver.find_element(By.CSS_SELECTOR, selector)
+            if title_element.text.strip() and len(title_element.text.strip()) > 10:
+                title = title_element.text.strip()
+                break
+        except:
+            continue
+
+    for selector in ABSTRACT_SELECTORS:
+        try:
+            abstract_element = driver.find_element(By.CSS_SELECTOR, selector)
+            if abstract_element.text.strip() and len(abstract_element.text.strip()) > 50:
+                abstract = abstract_element.text.strip()
+                break
+        except:
+            continue
+
+    # Nếu vẫn chưa tìm thấy abstract -> thử tìm trong các đoạn văn dài
+    if abstract == "Not Available":
+        try:
+            paragraphs = driver.find_elements(By.TAG_NAME, "p")
+            for p in paragraphs:
+                text = p.text.strip()
+                if len(text) > 100 and any(word in text.lower() for word in ABSTRACT_HINTS):
+                    abstract = text
+                    break
+        except:
+            pass
+
+    return title, abstract
+
+
+def _parse_html(content):
+    try:
+        return BeautifulSoup(content, "lxml")
+    except Exception:
+        return BeautifulSoup(content, "html.parser")
+
+
+def _meta_content(soup, names):
+    for name in names:
+        tag = soup.find("meta", attrs={"name": re.compile(f"^{re.escape(name)}$", re.I)}) \
+            or soup.find("meta", attrs={"property": re.compile(f"^{re.escape(name)}$", re.I)})
+        content = (tag.get("content") or "").strip() if tag else ""
+        if content:
+            return content
+    return ""
+
+
+def extract_details_from_html(content):
+    """
+    Lấy title và abstract từ HTML tĩnh: ưu tiên meta tag, sau đó dùng cùng
+    TITLE_SELECTORS / ABSTRACT_SELECTORS như bản Selenium.
+    """
+    soup = _parse_html(content)
+
+    title = _meta_content(soup, TITLE_META)
+    if len(title) <= 10:
+        title = "Not Available"
+        for selector in TITLE_SELECTORS:
+            element = soup.select_one(selector)
+            text = element.get_text(" ", strip=True) if element else ""
+            if len(text) > 10:
+                title = text
+                break
+
+    abstract = _meta_content(soup, ABSTRACT_META)
+    if len(abstract) <= 50:
+        abstract = "Not Available"
+        for selector in ABSTRACT_SELECTORS:
+            element = soup.select_one(selector)
+            text = element.get_text(" ", strip=True) if element else ""
+            if len(text) > 50:
+                abstract = text
+                break
+
+    if abstract == "Not Available":
+        for p in soup.find_all("p"):
+            text = p.get_text(" ", strip=True)
+            if len(text) > 100 and any(word in text.lower() for word in ABSTRACT_HINTS):
+                abstract = text
+                break
+
+    return title, abstract
+
+
+def fetch_details_http(paper_url: str):
+    """
+    Fast path: tải trang bằng HTTP thường (không render) và parse bằng BeautifulSoup.
+    Trả về dict chi tiết như get_paper_details_from_link, hoặc None nếu không lấy
+    được title + abstract (khi đó mới cần Selenium).
+    """
+    try:
+        response = http_client.get(paper_url, source="Scholar detail", headers=HTTP_HEADERS,
+                                   timeout=20, retries=1)
+    except requests.exceptions.RequestException:
+        return None
+    if "html" not in response.headers.get("Content-Type", "html"):
+        return None
+
+    title, abstract = extract_details_from_html(response.content)
+    if title == "Not Available" or abstract == "Not Available":
+        return None
+    return {
+        "title": title,
+        "abstract": abstract,
+        "url": paper_url,
+        "access_status": "success"
+    }
+
+
 class ScholarFinder:
-    def __init__(self):
+    def __init__(self, detail_workers: int = SCHOLAR_DETAIL_WORKERS, browsers=None):
         self.driver = None
-
-    def setup_browser(self):
-        """Setup Chrome browser với các tùy chọn an toàn"""
-        options = Options()
-        options.add_argument("--headless=new")
-        options.add_argument("--no-sandbox")
-        options.add_argument("--disable-dev-shm-usage")
-        options.add_argument('--no-sandbox')
-        options.add_argument('--disable-dev-shm-usage')
-        options.add_argument('--disable-blink-features=AutomationControlled')
-        options.add_experimental_option("excludeSwitches", ["enable-automation"])
-        options.add_experimental_option('useAutomationExtension', False)
-
-        self.driver = webdriver.Chrome(options=options)
-        self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-        return self.driver
+        self.detail_workers = detail_workers
+        self.throttle = get_scholar_throttle()
+        self.browsers = browsers or get_scholar_browsers()
 
     def extract_pub_date(self, authors_text: str):
         """
@@ -43,69 +267,29 @@ class ScholarFinder:
             return year_match.group(0)
         return "Not Available"
 
-    def get_paper_details_from_link(self, paper_url: str, paper_rank: int) -> Dict:
+    def get_paper_details_from_link(self, paper_url: str, paper_rank: int, driver=None) -> Dict:
         """
-        Mở link bài báo để lấy đầy đủ title và abstract
+        Mở link bài báo để lấy đầy đủ title và abstract.
+        Không truyền driver -> mở tab mới trên self.driver như trước.
         """
         print(f"Accessing paper {paper_rank}: {paper_url}")
+        use_tab = driver is None
+        driver = driver or self.driver
         try:
-            self.driver.execute_script("window.open('');")
-            self.driver.switch_to.window(self.driver.window_handles[-1])
-            self.driver.get(paper_url)
-            time.sleep(4)
-
-            title = "Not Available"
-            abstract = "Not Available"
-
-            # Title selectors
-            title_selectors = [
-                "h1", "h2", ".title", "#title",
-                "h1[class*='title']", "h2[class*='title']",
-                ".paper-title", ".article-title",
-                ".entry-title", ".post-title"
-            ]
-            for selector in title_selectors:
-                try:
-                    title_element = self.driver.find_element(By.CSS_SELECTOR, selector)
-                    if title_element.text.strip() and len(title_element.text.strip()) > 10:
-                        title = title_element.text.strip()
-                        break
-                except:
-                    continue
-
-            # Abstract selectors
-            abstract_selectors = [
-                ".abstract", "#abstract", "[class*='abstract']",
-                ".summary", "#summary", "[class*='summary']",
-                "p[class*='abstract']", "div[class*='abstract']",
-                ".paper-abstract", ".article-abstract",
-                "section[class*='abstract']", "[id*='abstract']"
-            ]
-            for selector in abstract_selectors:
-                try:
-                    abstract_element = self.driver.find_element(By.CSS_SELECTOR, selector)
-                    if abstract_element.text.strip() and len(abstract_element.text.strip()) > 50:
-                        abstract = abstract_element.text.strip()
-                        break
-                except:
-                    continue
+            self.throttle.wait(urlsplit(paper_url).netloc.lower())
+            if use_tab:
+                driver.execute_script("window.open('');")
+                driver.switch_to.window(driver.window_handles[-1])
+            driver.get(paper_url)
+            self.browsers.mark_page(driver)
+            wait_until_ready(driver)
 
-            # Nếu vẫn chưa tìm thấy abstract -> thử tìm trong các đoạn văn dài
-            if abstract == "Not Available":
-                try:
-                    paragraphs = self.driver.find_elements(By.TAG_NAME, "p")
-                    for p in paragraphs:
-                        text = p.text.strip()
-                        if len(text) > 100 and any(word in text.lower() for word in
-                                                    ['abstract', 'this paper', 'this study', 'we present', 'we propose']):
-                            abstract = text
-                            break
-                except:
-                    pass
+            title, abstract = extract_details(driver)
 
             # Đóng tab hiện tại, quay về tab chính
-            self.driver.close()
-            self.driver.switch_to.window(self.driver.window_handles[0])
+            if use_tab:
+                driver.close()
+                driver.switch_to.window(driver.window_handles[0])
 
             return {
                 "title": title,
@@ -117,9 +301,9 @@ class ScholarFinder:
         except Exception as e:
             print(f"Error accessing paper {paper_rank}: {e}")
             try:
-                if len(self.driver.window_handles) > 1:
-                    self.driver.close()
-                    self.driver.switch_to.window(self.driver.window_handles[0])
+                if use_tab and len(driver.window_handles) > 1:
+                    driver.close()
+                    driver.switch_to.window(driver.window_handles[0])
             except:
                 pass
             return {
@@ -129,48 +313,78 @@ class ScholarFinder:
                 "access_status": "error"
             }
 
-    def search_google_scholar(self, search_query: str, max_papers: int = 20, date: str = None) -> List[Dict]:
+    def fetch_details_http_first(self, paper_url: str, paper_rank: int) -> Dict:
+        """Thử fast path HTTP trước; None nếu cần Selenium."""
+        self.throttle.wait(urlsplit(paper_url).netloc.lower())
+        details = fetch_details_http(paper_url)
+        if details:
+            print(f"⚡ Fast path paper {paper_rank}: {paper_url}")
+        return details
+
+    def fetch_details_parallel(self, links: List[str]) -> List[Dict]:
         """
-        Tìm kiếm Google Scholar và trả về danh sách bài báo mới nhất,
-        chỉ lấy đúng ngày (nếu có date).
+        Lấy chi tiết nhiều bài cùng lúc. Mọi link được thử fast path HTTP trước;
+        chỉ những link thất bại mới được mở bằng tối đa detail_workers trình
+        duyệt headless (mỗi domain vẫn bị giãn cách bởi self.throttle).
+        Trình duyệt lấy từ self.browsers: dùng lại self.driver và chỉ mượn thêm
+        driver đang rảnh (không chờ), nên các phiên chạy song song không khóa nhau.
+        Kết quả trả về đúng thứ tự links.
         """
-        print(f"Searching Google Scholar for: {search_query}")
-        self.driver.get("https://scholar.google.com")
-        time.sleep(3)
-
-        # Nhập từ khóa
-        search_box = WebDriverWait(self.driver, 10).until(
-            EC.presence_of_element_located((By.NAME, "q"))
-        )
-        search_box.clear()
-        search_box.send_keys(search_query)
-        self.driver.find_element(By.XPATH, "//button[@type='submit']").click()
-        time.sleep(4)
+        if not links:
+            return []
+        workers = max(1, min(self.detail_workers * 2, len(links)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            details = list(executor.map(lambda args: self.fetch_details_http_first(args[1], args[0]),
+                                        enumerate(links, 1)))
+
+        pending = [(rank, link) for rank, link in enumerate(links, 1) if details[rank - 1] is None]
+        print(f"Fast path: {len(links) - len(pending)}/{len(links)} bài, Selenium: {len(pending)} bài")
+        if not pending:
+            return details
+
+        wanted = max(1, min(self.detail_workers, len(pending)))
+        borrowed = []
+        if self.driver is None:
+            borrowed.append(self.browsers.acquire())
+        while len(borrowed) + (self.driver is not None) < wanted:
+            driver = self.browsers.acquire(block=False)
+            if driver is None:
+                break
+            borrowed.append(driver)
+        drivers = ([self.driver] if self.driver is not None else []) + borrowed
+        workers = len(drivers)
+        pool = queue.Queue()
+        for d in drivers:
+            pool.put(d)
+
+        def fetch(args):
+            rank, link = args
+            driver = pool.get()
+            try:
+                return rank, self.get_paper_details_from_link(link, rank, driver=driver)
+            finally:
+                pool.put(driver)
 
-        # Click "Sort by date"
         try:
-            sort_by_date_button = WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located(
-                    (By.XPATH, "//a[normalize-space(text())='Sắp xếp theo ngày' or normalize-space(text())='Sort by date']")
-                )
-            )
-            self.driver.execute_script("arguments[0].scrollIntoView(true);", sort_by_date_button)
-            time.sleep(1)
-            self.driver.execute_script("arguments[0].click();", sort_by_date_button)
-            time.sleep(2)
-            print("✔ Đã click 'Sắp xếp theo ngày'")
-        except Exception as e:
-            print(f"⚠ Không click được 'Sắp xếp theo ngày': {e}")
-
-        papers = []
-        results = self.driver.find_elements(By.CSS_SELECTOR, "div.gs_r.gs_or.gs_scl")[:max_papers]
-        print(f"Found {len(results)} papers to process")
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for rank, detail in executor.map(fetch, pending):
+                    details[rank - 1] = detail
+        finally:
+            for d in borrowed:
+                self.browsers.release(d)
+        return details
 
-        for idx, result in enumerate(results, 1):
+    def _parse_result_rows(self, results, date, offset):
+        """
+        Đọc các dòng kết quả của một trang Scholar.
+        Trả về (entries khớp date, True nếu mọi dòng có năm đều cũ hơn date).
+        """
+        entries = []
+        dated, older = 0, 0
+        for idx, result in enumerate(results, offset + 1):
             try:
                 title_element = result.find_element(By.CSS_SELECTOR, "h3.gs_rt a")
                 link = title_element.get_attribute("href")
-                basic_title = title_element.text
 
                 try:
                     authors_text = result.find_element(By.CSS_SELECTOR, "div.gs_a").text
@@ -178,6 +392,9 @@ class ScholarFinder:
                     authors_text = "Authors not found"
 
                 pub_date = self.extract_pub_date(authors_text)
+                if pub_date != "Not Available":
+                    dated += 1
+                    older += is_older_than(pub_date, date)
 
                 # 🔹 Lọc theo ngày (nếu có yêu cầu)
                 if date and pub_date != date:
@@ -190,37 +407,122 @@ class ScholarFinder:
                 except:
                     citations = 0
 
-                full_details = self.get_paper_details_from_link(link, idx)
-
-                paper = {
-                    "source": "Google Scholar",
-                    "title": full_details['title'],
-                    "abstract": full_details['abstract'],
-                    "authors": authors_text,
+                entries.append({
                     "link": link,
+                    "authors": authors_text,
                     "citations": citations,
-                    "status": "Open Access",
                     "pub_date": pub_date
-                }
-
-                papers.append(paper)
-                print(f"✓ Processed paper {idx}: {paper['title'][:80]}")
-                time.sleep(3)
-
+                })
             except Exception as e:
                 print(f"Error processing paper {idx}: {e}")
                 continue
 
+        return entries, bool(date) and dated > 0 and older == dated
+
+    def search_google_scholar(self, search_query: str, max_papers: int = 20, date: str = None) -> List[Dict]:
+        """
+        Tìm kiếm Google Scholar và trả về danh sách bài báo mới nhất,
+        chỉ lấy đúng ngày (nếu có date).
+        Duyệt nhiều trang kết quả (sắp xếp theo ngày) tới khi đủ max_papers, hết kết quả
+        hoặc cả trang đã cũ hơn date. Trang chi tiết được mở song song (xem fetch_details_parallel).
+        """
+        print(f"Searching Google Scholar for: {search_query}")
+        self.throttle.wait(SCHOLAR_HOST)
+        self.driver.get("https://scholar.google.com")
+        self.browsers.mark_page(self.driver)
+
+        # Nhập từ khóa
+        search_box = WebDriverWait(self.driver, 10).until(
+            EC.presence_of_element_located((By.NAME, "q"))
+        )
+        search_box.clear()
+        search_box.send_keys(search_query)
+        self.throttle.wait(SCHOLAR_HOST)
+        self.driver.find_element(By.XPATH, "//button[@type='submit']").click()
+        WebDriverWait(self.driver, 10).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, "div.gs_r.gs_or.gs_scl"))
+        )
+
+        # Click "Sort by date"
+        try:
+            sort_by_date_button = WebDriverWait(self.driver, 10).until(
+                EC.element_to_be_clickable(
+                    (By.XPATH, "//a[normalize-space(text())='Sắp xếp theo ngày' or normalize-space(text())='Sort by date']")
+                )
+            )
+            first_result = self.driver.find_element(By.CSS_SELECTOR, "div.gs_r.gs_or.gs_scl")
+            self.throttle.wait(SCHOLAR_HOST)
+            self.driver.execute_script("arguments[0].scrollIntoView(true);", sort_by_date_button)
+            self.driver.execute_script("arguments[0].click();", sort_by_date_button)
+            WebDriverWait(self.driver, 10).until(EC.staleness_of(first_result))
+            wait_until_ready(self.driver)
+            print("✔ Đã click 'Sắp xếp theo ngày'")
+        except Exception as e:
+            print(f"⚠ Không click được 'Sắp xếp theo ngày': {e}")
+
+        # 1. Đọc thông tin cơ bản qua từng trang kết quả (start=0, 10, 20, ...)
+        entries = []
+        seen = 0
+        for page in range(SCHOLAR_MAX_PAGES):
+            if page > 0:
+                self.throttle.wait(SCHOLAR_HOST)
+                first_result = self.driver.find_element(By.CSS_SELECTOR, "div.gs_r.gs_or.gs_scl")
+                self.driver.get(scholar_page_url(self.driver.current_url, seen))
+                self.browsers.mark_page(self.driver)
+                try:
+                    WebDriverWait(self.driver, 10).until(EC.staleness_of(first_result))
+                    WebDriverWait(self.driver, 10).until(
+                        EC.presence_of_element_located((By.CSS_SELECTOR, "div.gs_r.gs_or.gs_scl"))
+                    )
+                except TimeoutException:
+                    print(f"⚠ Không tải được trang kết quả {page + 1}, dừng phân trang.")
+                    break
+
+            results = self.driver.find_elements(By.CSS_SELECTOR, "div.gs_r.gs_or.gs_scl")
+            print(f"Found {len(results)} papers on result page {page + 1}")
+            if not results:
+                break
+
+            page_entries, reached_older = self._parse_result_rows(results, date, seen)
+            entries.extend(page_entries)
+            seen += len(results)
+
+            if len(entries) >= max_papers:
+                entries = entries[:max_papers]
+                break
+            # Kết quả đang sắp xếp theo ngày: cả trang đã cũ hơn ngày cần lấy -> dừng sớm
+            if reached_older:
+                print(f"⏹ Kết quả đã cũ hơn {date}, dừng phân trang.")
+                break
+
+        # 2. Lấy title/abstract đầy đủ song song
+        details = self.fetch_details_parallel([entry["link"] for entry in entries])
+
+        papers = []
+        for idx, (entry, full_details) in enumerate(zip(entries, details), 1):
+            paper = {
+                "source": "Google Scholar",
+                "title": full_details['title'],
+                "abstract": full_details['abstract'],
+                "authors": entry["authors"],
+                "link": entry["link"],
+                "citations": entry["citations"],
+                "status": "Open Access",
+                "pub_date": entry["pub_date"]
+            }
+            papers.append(paper)
+            print(f"✓ Processed paper {idx}: {paper['title'][:80]}")
+
         print(f"\n=== Successfully processed {len(papers)} papers ===")
         return papers
 
     def run(self, keyword: str, max_papers: int = 100, date: str = None):
-        self.setup_browser()
-        try:
-            return self.search_google_scholar(keyword, max_papers, date)
-        finally:
-            if self.driver:
-                self.driver.quit()
+        with self.browsers.browser() as driver:
+            self.driver = driver
+            try:
+                return self.search_google_scholar(keyword, max_papers, date)
+            finally:
+                self.driver = None
 
 
 def run_scholar_search(keyword: str, max_papers: int = 100):
@@ -2,8 +2,18 @@ import requests
 import json
 import os
 import xml.etree.ElementTree as ET
+from urllib.parse import urlsplit
 from dotenv import load_dotenv
+import threading
 import time
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import http_client
+from rate_limiter import get_limiter, get_rate_limit_stats
+from cache import get_llm_cache, get_scrape_cache, make_key
+from entity_resolution import resolve_entities
+from paper_record import PUB_DATE, arxiv_values, crossref_values, decode_openalex_abstract, openalex_values, record_dict
+from relevance_prefilter import ACCEPT_AT, REJECT_BELOW, split_by_relevance
 from google.genai import Client
 from google.genai.types import GenerateContentConfig
 load_dotenv()
@@ -20,60 +30,80 @@ RESULTS_DIR = "results"
 # ========================
 # 1. OpenAlex API
 # ========================
-def decode_openalex_abstract(inverted_index):
-    if not inverted_index:
-        return "Not Available"
-    words = sorted([(pos, word) for word, positions in inverted_index.items() for pos in positions])
-    return " ".join(word for pos, word in words)
+OPENALEX_MAX_PER_PAGE = 200
+OPENALEX_API_KEY = os.getenv("OPENALEX_API_KEY")
+
+
+def openalex_filters(date=None, since=None):
+    """
+    Bộ lọc server-side của OpenAlex. since (YYYY-MM-DD) dùng from_created_date (chỉ bài mới
+    được thêm vào OpenAlex, cần OPENALEX_API_KEY premium); không có key thì dùng
+    from_publication_date. Kết quả luôn sắp theo publication_date nên khi bị cắt,
+    mark dời theo publication_date (bài thêm muộn nhưng xuất bản trước mốc có thể bị lỡ).
+    """
+    filters = []
+    if date:
+        filters.append(f"from_publication_date:{date},to_publication_date:{date}")
+    if since:
+        field = "from_created_date" if OPENALEX_API_KEY else "from_publication_date"
+        filters.append(f"{field}:{since}")
+    return ",".join(filters)
 
-def search_openalex(query="Non-Destructive Testing", rows=100, date=None):
+
+def iter_openalex(query="Non-Destructive Testing", max_results=1000, date=None, per_page=OPENALEX_MAX_PER_PAGE,
+                  since=None, coverage=None):
+    """
+    Duyệt kết quả OpenAlex theo từng trang bằng cursor paging (cursor=*).
+    Yield từng bài báo đã chuẩn hóa ngay khi trang về, dừng khi đủ max_results
+    (None = không giới hạn) hoặc hết trang. since: chỉ lấy bài mới từ ngày này.
+    coverage (dict): nếu có, coverage["oldest"] = ngày (YYYY-MM-DD) của bài cũ nhất đã yield
+    theo trục sắp xếp (publication_date giảm dần) - mọi bài mới hơn ngày đó đã được trả về.
+    Lỗi mạng / dữ liệu hỏng (sau khi đã retry) được raise lại để nơi gọi không coi
+    nguồn lỗi là tìm kiếm thành công nhưng rỗng.
+    """
     url = "https://api.openalex.org/works"
     params = {
         "search": query,
-        "per_page": rows,
-        "sort": "publication_date:desc"
+        "per_page": min(per_page, OPENALEX_MAX_PER_PAGE),
+        "sort": "publication_date:desc",
+        "cursor": "*"
     }
-    if date:
-        params["filter"] = f"from_publication_date:{date},to_publication_date:{date}"
-
-    try:
-        response = requests.get(url, params=params, timeout=30)
-        response.raise_for_status()
-    except requests.exceptions.RequestException:
-        return []
-
-    data = response.json()
-    if "results" not in data or not data["results"]:
-        return []
-
-    results = []
-    for item in data["results"]:
-        pub_date = item.get("publication_date", "Not Available")
-        if date and pub_date != date:
-            continue
-
-        title = item.get("title", "No title")
-        abstract = decode_openalex_abstract(item.get("abstract_inverted_index"))
-        if abstract and isinstance(abstract, str):
-            abstract = abstract.replace("\n", " ").strip()
-
-        authors = [a["author"]["display_name"] for a in item.get("authorships", []) if "author" in a]
-        authors_str = ", ".join(authors) if authors else "Not Available"
-        link = item.get("primary_location", {}).get("landing_page_url", "Not Available")
-        citations = item.get("cited_by_count", 0)
-        status = item.get("open_access", {}).get("status", "Not Available")
-
-        results.append({
-            "source": "OpenAlex",
-            "title": title,
-            "abstract": abstract,
-            "authors": authors_str,
-            "link": link,
-            "citations": citations,
-            "status": status,
-            "pub_date": pub_date
-        })
-    return results
+    if max_results is not None:
+        params["per_page"] = max(1, min(params["per_page"], max_results))
+    if date or since:
+        params["filter"] = openalex_filters(date, since)
+    if OPENALEX_API_KEY:
+        params["api_key"] = OPENALEX_API_KEY
+
+    yielded = 0
+    while params["cursor"]:
+        try:
+            response = http_client.cached_get(url, source="OpenAlex", params=params, timeout=30)
+            data = response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"[OpenAlex Error] {e}")
+            raise
+
+        items = data.get("results") or []
+        if not items:
+            return
+
+        for item in items:
+            values = openalex_values(item)
+            if date and values[PUB_DATE] != date:
+                continue
+            if coverage is not None:
+                coverage["oldest"] = values[PUB_DATE]
+            yield record_dict(values)
+            yielded += 1
+            if max_results is not None and yielded >= max_results:
+                return
+
+        params["cursor"] = data.get("meta", {}).get("next_cursor")
+
+
+def search_openalex(query="Non-Destructive Testing", rows=100, date=None, since=None, coverage=None):
+    return list(iter_openalex(query, max_results=rows, date=date, since=since, coverage=coverage))
 
 
 # ========================
@@ -88,9 +118,9 @@ def search_semantic_scholar(query="Non-Destructive Testing", rows=100, date=None
     }
 
     try:
-        response = requests.get(url, params=params, timeout=30)
-        response.raise_for_status()
-    except requests.exceptions.RequestException:
+        response = http_client.cached_get(url, source="Semantic Scholar", params=params, timeout=30)
+    except requests.exceptions.RequestException as e:
+        print(f"[Semantic Scholar Error] {e}")
         return []
 
     data = response.json()
@@ -126,111 +156,151 @@ def search_semantic_scholar(query="Non-Destructive Testing", rows=100, date=None
 # ========================
 # 3. arXiv API
 # ========================
-def search_arxiv(query="Non-Destructive Testing", rows=100, date=None):
+ARXIV_NS = {"arxiv": "http://www.w3.org/2005/Atom"}
+ARXIV_PAGE_SIZE = 100
+ARXIV_PAGE_DELAY = 3  # arXiv yêu cầu nghỉ ~3s giữa các request liên tiếp
+
+
+def arxiv_search_query(query, since=None):
+    """Truy vấn arXiv; since (YYYY-MM-DD) thêm khoảng submittedDate từ ngày đó tới nay."""
+    search_query = f"all:{query}"
+    if since:
+        start = since.replace("-", "")
+        end = datetime.now(timezone.utc).strftime("%Y%m%d")
+        search_query += f" AND submittedDate:[{start}0000 TO {end}2359]"
+    return search_query
+
+
+def iter_arxiv(query="Non-Destructive Testing", max_results=1000, date=None, page_size=ARXIV_PAGE_SIZE, since=None,
+               coverage=None):
+    """
+    Duyệt kết quả arXiv theo từng trang bằng offset start=.
+    Kết quả sắp xếp theo submittedDate giảm dần nên khi có date,
+    gặp bài cũ hơn date là dừng luôn. since: chỉ lấy bài nộp từ ngày này.
+    coverage như iter_openalex (trục submittedDate).
+    Lỗi mạng / XML hỏng được raise lại như iter_openalex.
+    """
     url = "http://export.arxiv.org/api/query"
+    if max_results is not None:
+        page_size = max(1, min(page_size, max_results))
     params = {
-        "search_query": f"all:{query}",
+        "search_query": arxiv_search_query(query, since),
         "start": 0,
-        "max_results": rows,
+        "max_results": page_size,
         "sortBy": "submittedDate",
         "sortOrder": "descending"
     }
 
-    try:
-        response = requests.get(url, params=params, timeout=30)
-        response.raise_for_status()
-    except requests.exceptions.RequestException:
-        return []
+    yielded = 0
+    while True:
+        try:
+            response = http_client.cached_get(url, source="arXiv", params=params, timeout=30)
+            root = ET.fromstring(response.content)
+        except (requests.exceptions.RequestException, ET.ParseError) as e:
+            print(f"[arXiv Error] {e}")
+            raise
+
+        entries = root.findall("arxiv:entry", ARXIV_NS)
+        if not entries:
+            return
+
+        for entry in entries:
+            values = arxiv_values(entry)
+            if date and values[PUB_DATE] < date:
+                return
+            if date and values[PUB_DATE] != date:
+                continue
+            if coverage is not None:
+                coverage["oldest"] = values[PUB_DATE]
+            yield record_dict(values)
+            yielded += 1
+            if max_results is not None and yielded >= max_results:
+                return
+
+        if len(entries) < params["max_results"]:
+            return
+        params["start"] += len(entries)
+        time.sleep(ARXIV_PAGE_DELAY)
+
+
+def search_arxiv(query="Non-Destructive Testing", rows=100, date=None, since=None, coverage=None):
+    return list(iter_arxiv(query, max_results=rows, date=date, since=since, coverage=coverage))
 
-    root = ET.fromstring(response.content)
-    ns = {"arxiv": "http://www.w3.org/2005/Atom"}
-    entries = root.findall("arxiv:entry", ns)
-    if not entries:
-        return []
 
-    results = []
-    for entry in entries:
-        title = entry.find("arxiv:title", ns).text.strip()
-        abstract = entry.find("arxiv:summary", ns).text.strip()
-        link = entry.find("arxiv:id", ns).text.strip()
-        authors = [a.find("arxiv:name", ns).text for a in entry.findall("arxiv:author", ns)]
-        authors_str = ", ".join(authors) if authors else "Not Available"
-        pub_date = entry.find("arxiv:published", ns).text[:10]
+# ========================
+# 4. CrossRef API
+# ========================
+CROSSREF_MAX_ROWS = 1000
 
-        if date and pub_date != date:
-            continue
 
-        results.append({
-            "source": "arXiv",
-            "title": title,
-            "abstract": abstract,
-            "authors": authors_str,
-            "link": link,
-            "citations": 0,
-            "status": "Open Access",
-            "pub_date": pub_date
-        })
-    return results
+def crossref_date(item, field):
+    """Ngày YYYY-MM-DD từ date-parts của trường field (thiếu tháng / ngày -> ngày đầu tiên), hoặc None."""
+    parts = ((item.get(field) or {}).get("date-parts") or [[None]])[0]
+    if not parts or parts[0] is None:
+        return None
+    year, month, day = (list(parts) + [1, 1])[:3]
+    return f"{int(year):04d}-{int(month or 1):02d}-{int(day or 1):02d}"
 
 
-# ========================
-# 4. CrossRef API
-# ========================
-def search_crossref(query="Non-Destructive Testing", rows=100, date=None):
+def iter_crossref(query="Non-Destructive Testing", max_results=1000, date=None, rows=CROSSREF_MAX_ROWS, since=None,
+                  coverage=None):
+    """
+    Duyệt kết quả Crossref theo từng trang bằng deep paging (cursor=*).
+    Yield từng bài báo đã chuẩn hóa, dừng khi đủ max_results hoặc hết trang.
+    since: chỉ lấy bản ghi được index (thêm / cập nhật) từ ngày này (from-index-date); khi đó
+    kết quả sắp theo ngày index để phần bị cắt ở max_results nằm trên cùng trục với since.
+    coverage như iter_openalex (trục "indexed" khi có since, ngược lại "published").
+    Lỗi mạng / dữ liệu hỏng được raise lại như iter_openalex.
+    """
     url = "https://api.crossref.org/works"
     params = {
         "query": query,
-        "rows": rows,
-        "sort": "published",
-        "order": "desc"
+        "rows": min(rows, CROSSREF_MAX_ROWS),
+        "sort": "indexed" if since else "published",
+        "order": "desc",
+        "cursor": "*"
     }
+    if max_results is not None:
+        params["rows"] = max(1, min(params["rows"], max_results))
+    filters = []
     if date:
-        params["filter"] = f"from-pub-date:{date},until-pub-date:{date}"
-
-    try:
-        response = requests.get(url, params=params, timeout=30)
-        response.raise_for_status()
-    except requests.exceptions.RequestException:
-        return []
-
-    data = response.json()
-    if "message" not in data or "items" not in data["message"]:
-        return []
-
-    results = []
-    for item in data["message"]["items"]:
-        date_parts = item.get("issued", {}).get("date-parts", [[None]])
-        pub_date = "-".join(str(p) for p in date_parts[0] if p is not None)
-        if date and pub_date != date:
-            continue
-
-        title = item.get("title", ["No title"])[0]
-        abstract = item.get("abstract", "Not Available")
-        if abstract and isinstance(abstract, str):
-            abstract = abstract.replace("\n", " ").strip()
-
-        authors = []
-        for a in item.get("author", []):
-            full_name = f"{a.get('given', '')} {a.get('family', '')}".strip()
-            if full_name:
-                authors.append(full_name)
-        authors_str = ", ".join(authors) if authors else "Not Available"
-        doi = item.get("DOI", "")
-        link = f"https://doi.org/{doi}" if doi else "Not Available"
-        citations = item.get("is-referenced-by-count", 0)
-        status = item.get("publisher", "Not Available")
-
-        results.append({
-            "source": "Crossref",
-            "title": title,
-            "abstract": abstract,
-            "authors": authors_str,
-            "link": link,
-            "citations": citations,
-            "status": status,
-            "pub_date": pub_date
-        })
-    return results
+        filters.append(f"from-pub-date:{date},until-pub-date:{date}")
+    if since:
+        filters.append(f"from-index-date:{since}")
+    if filters:
+        params["filter"] = ",".join(filters)
+
+    yielded = 0
+    while params["cursor"]:
+        try:
+            response = http_client.cached_get(url, source="Crossref", params=params, timeout=30)
+            message = response.json().get("message", {})
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"[Crossref Error] {e}")
+            raise
+
+        items = message.get("items") or []
+        if not items:
+            return
+
+        for item in items:
+            values = crossref_values(item)
+            if date and values[PUB_DATE] != date:
+                continue
+            if coverage is not None:
+                coverage["oldest"] = crossref_date(item, params["sort"])
+            yield record_dict(values)
+            yielded += 1
+            if max_results is not None and yielded >= max_results:
+                return
+
+        if len(items) < params["rows"]:
+            return
+        params["cursor"] = message.get("next-cursor")
+
+
+def search_crossref(query="Non-Destructive Testing", rows=100, date=None, since=None, coverage=None):
+    return list(iter_crossref(query, max_results=rows, date=date, since=since, coverage=coverage))
 
 
 # ========================
@@ -239,15 +309,10 @@ def search_crossref(query="Non-Destructive Testing", rows=100, date=None):
 def merge_and_save(all_results, filename):
     """
     Gộp tất cả kết quả vào 1 file và loại bỏ trùng lặp.
-    Trùng lặp được xác định bởi: title + authors hoặc link.
+    Trùng lặp được xác định bởi DOI, arXiv id hoặc title gần giống + chung tác giả
+    (xem entity_resolution.resolve_entities).
     """
-    unique = {}
-    for paper in all_results:
-        key = (paper['title'].lower().strip(), paper['authors'].lower().strip(), paper['link'].lower().strip())
-        if key not in unique:
-            unique[key] = paper
-
-    final_results = list(unique.values())
+    final_results = resolve_entities(all_results)
 
     if not os.path.exists(RESULTS_DIR):
         os.makedirs(RESULTS_DIR)
@@ -258,10 +323,47 @@ def merge_and_save(all_results, filename):
 
     print(f"Saved {len(final_results)} unique papers to {filepath}")
 
+# Lỗi do tài khoản/quota Firecrawl (không phải do trang đích) -> không ghi negative cache
+FIRECRAWL_ACCOUNT_ERRORS = {401, 402, 429}
+
+
+def extract_abstract_from_markdown(content):
+    """Cắt đoạn abstract (nhiều dòng) từ markdown Firecrawl trả về."""
+    lines = content.splitlines()
+    abstract_lines = []
+    capture = False
+
+    for line in lines:
+        low = line.lower().strip()
+        # Bắt đầu từ Abstract / Tóm tắt
+        if "abstract" in low or "tóm tắt" in low:
+            capture = True
+            continue
+        # Nếu gặp Keywords / Introduction thì dừng lại
+        if capture and ("keywords" in low or "introduction" in low or "references" in low):
+            break
+        if capture:
+            abstract_lines.append(line.strip())
+
+    return " ".join(abstract_lines).strip()
+
+
 def fetch_abstract_firecrawl(url):
     """
     Dùng Firecrawl Scrape API, trích xuất toàn bộ abstract (nhiều dòng).
+    Kết quả được lưu theo URL trong ScrapeCache: URL đã scrape (kể cả thất bại
+    trong thời hạn negative cache) và domain liên tục thất bại sẽ không bị gọi lại.
     """
+    scrape_cache = get_scrape_cache()
+    found, cached = scrape_cache.lookup(url)
+    if found:
+        return cached or "Not Available"
+
+    domain = urlsplit(url).netloc.lower()
+    if scrape_cache.is_domain_blocked(domain):
+        print(f"⏩ Bỏ qua domain thường xuyên lỗi: {domain}")
+        return "Not Available"
+
     if not FIRECRAWL_API_KEY:
         raise ValueError("Thiếu FIRECRAWL_API_KEY, hãy set trong biến môi trường.")
 
@@ -273,54 +375,160 @@ def fetch_abstract_firecrawl(url):
     }
 
     try:
-        resp = requests.post(api_url, json=payload, headers=headers, timeout=60)
-        resp.raise_for_status()
+        resp = http_client.post(api_url, source="Firecrawl", json=payload, headers=headers, timeout=60,
+                                limiter=get_limiter("firecrawl"))
         data = resp.json()
     except requests.exceptions.RequestException as e:
         print(f"[Firecrawl Error] {e}")
+        status = getattr(getattr(e, "response", None), "status_code", None)
+        if status is not None and status not in FIRECRAWL_ACCOUNT_ERRORS:
+            scrape_cache.store(url, domain, None)
         return "Not Available"
 
     content = data.get("data", {}).get("markdown", "")
-    if not content:
-        return "Not Available"
+    abstract = extract_abstract_from_markdown(content) if content else ""
+    scrape_cache.store(url, domain, abstract or None)
+    return abstract if abstract else "Not Available"
 
-    lines = content.splitlines()
-    abstract_lines = []
-    capture = False
 
-    for line in lines:
-        low = line.lower().strip()
-        # Bắt đầu từ Abstract / Tóm tắt
-        if "abstract" in low or "tóm tắt" in low:
-            capture = True
-            continue
-        # Nếu gặp Keywords / Introduction thì dừng lại
-        if capture and ("keywords" in low or "introduction" in low or "references" in low):
-            break
-        if capture:
-            abstract_lines.append(line.strip())
+FIRECRAWL_CONCURRENCY = int(os.getenv("FIRECRAWL_CONCURRENCY", 4))
+FIRECRAWL_PER_DOMAIN = int(os.getenv("FIRECRAWL_PER_DOMAIN", 2))
 
-    abstract = " ".join(abstract_lines).strip()
-    return abstract if abstract else "Not Available"
+
+class DomainSlots:
+    """Semaphore theo domain đích: tối đa per_domain request Firecrawl cùng lúc tới mỗi domain."""
+
+    def __init__(self, per_domain=FIRECRAWL_PER_DOMAIN):
+        self.per_domain = max(1, per_domain)
+        self._slots = {}
+        self._lock = threading.Lock()
+
+    def slot(self, url):
+        domain = urlsplit(url).netloc.lower()
+        with self._lock:
+            if domain not in self._slots:
+                self._slots[domain] = threading.Semaphore(self.per_domain)
+            return self._slots[domain]
+
+
+def needs_abstract(paper):
+    return (not paper.get("abstract") or paper["abstract"] == "Not Available") and paper.get("link") != "Not Available"
+
+
+def enrich_paper(paper, domain_slots):
+    """Bổ sung abstract cho một bài (dùng trong pipeline streaming, mỗi worker một bài)."""
+    if needs_abstract(paper):
+        with domain_slots.slot(paper["link"]):
+            paper["abstract"] = fetch_abstract_firecrawl(paper["link"])
+        mark = "✓" if paper["abstract"] != "Not Available" else "✘"
+        print(f"{mark} Firecrawl: {paper.get('title', 'Untitled')[:80]}")
+    return paper
 
 
-def enrich_with_firecrawl(results):
+def enrich_with_firecrawl(results, max_workers=FIRECRAWL_CONCURRENCY, per_domain=FIRECRAWL_PER_DOMAIN,
+                          domain_slots=None):
     """
     Nhận danh sách results (các bài báo đã crawl từ OpenAlex, Arxiv, etc.)
     Nếu abstract = 'Not Available' thì dùng Firecrawl lấy abstract từ link.
+
+    Các bài được scrape song song bởi tối đa max_workers thread, mỗi domain
+    đích tối đa per_domain request cùng lúc (tổng tốc độ vẫn do limiter
+    "firecrawl" quyết định). Abstract được ghi lại vào đúng dict ban đầu.
+    Truyền domain_slots (DomainSlots) để chia sẻ giới hạn domain giữa nhiều lần gọi.
     """
-    for paper in results:
-        if (not paper.get("abstract") or paper["abstract"] == "Not Available") and paper.get("link") != "Not Available":
-            print(f"Fetching abstract with Firecrawl for: {paper['title']}")
-            paper["abstract"] = fetch_abstract_firecrawl(paper["link"])
-            time.sleep(6)
+    todo = [idx for idx, paper in enumerate(results) if needs_abstract(paper)]
+    if not todo:
+        return results
+
+    domain_slots = domain_slots or DomainSlots(per_domain)
+
+    def scrape(idx):
+        paper = results[idx]
+        with domain_slots.slot(paper["link"]):
+            return idx, fetch_abstract_firecrawl(paper["link"])
+
+    print(f"Fetching abstracts with Firecrawl for {len(todo)} papers ({max_workers} workers)...")
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = [executor.submit(scrape, idx) for idx in todo]
+        for done, future in enumerate(as_completed(futures), 1):
+            idx, abstract = future.result()
+            results[idx]["abstract"] = abstract
+            mark = "✓" if abstract != "Not Available" else "✘"
+            print(f"[{done}/{len(todo)}] {mark} {results[idx].get('title', 'Untitled')[:80]}")
+
+    print(f"🗃️ Firecrawl cache: {get_scrape_cache().stats()}")
     return results
 
 
+# =========================================
+# Gọi Gemini qua rate limiter dùng chung
+# =========================================
+GEMINI_MODEL = "gemini-2.5-flash"
+GEMINI_MAX_RETRIES = 3
+
+
+def is_rate_limit_error(e):
+    """Lỗi 429 / RESOURCE_EXHAUSTED từ Gemini."""
+    return getattr(e, "code", None) == 429 or "RESOURCE_EXHAUSTED" in str(e)
+
+
+def generate_with_genai(prompt, temperature=0, **config):
+    """
+    Gửi prompt tới Gemini, chờ token của rate limiter "gemini" trước mỗi lần gọi.
+    Gặp 429 thì limiter tự giảm tốc và gọi lại (tối đa GEMINI_MAX_RETRIES lần).
+    Trả về text của response; các lỗi khác được raise cho hàm gọi xử lý.
+    """
+    limiter = get_limiter("gemini")
+    for attempt in range(GEMINI_MAX_RETRIES + 1):
+        limiter.acquire()
+        try:
+            response = client.models.generate_content(
+                model=GEMINI_MODEL,
+                contents=prompt,
+                config=GenerateContentConfig(temperature=temperature, **config)
+            )
+        except Exception as e:
+            if is_rate_limit_error(e) and attempt < GEMINI_MAX_RETRIES:
+                limiter.on_rate_limited()
+                print(f"[Gemini] Bị giới hạn quota -> giảm tốc còn {limiter.rpm:.1f} rpm và thử lại")
+                continue
+            raise
+        limiter.on_success()
+        return response.text.strip()
+
+
+RELEVANCE_PROMPT = """
+    You are an expert in scientific paper classification.
+
+    Task: Determine whether the following abstract is related to the topic: {topic}.
+    Answer only with "YES" or "NO".
+
+    Abstract:
+    {abstract}
+    """
+
+
+def relevance_cache_key(abstract, keywords):
+    return make_key("relevance", GEMINI_MODEL, RELEVANCE_PROMPT, "|".join(keywords), abstract)
+
+
+def _relevance_from_genai(abstract, keywords):
+    """Gọi Gemini cho một abstract và ghi cache. Lỗi -> None (không ghi cache)."""
+    prompt = RELEVANCE_PROMPT.format(topic=", ".join(keywords), abstract=abstract)
+    try:
+        answer = generate_with_genai(prompt, temperature=0).upper()
+    except Exception as e:
+        print(f"[Gemini Error - Relevance Check] {e}")
+        return None
+    is_relevant = "YES" in answer
+    get_llm_cache().set(relevance_cache_key(abstract, keywords), is_relevant)
+    return is_relevant
+
+
 def check_relevance_with_genai(abstract, keywords):
     """
     Kiểm tra abstract có liên quan tới các từ khóa nghiên cứu (vd: NDT) hay không.
-    Trả về True/False.
+    Trả về True/False. Kết quả được tra / lưu trong cache LLM trên đĩa.
 
     Parameters:
         abstract (str): Abstract của bài báo.
@@ -329,71 +537,328 @@ def check_relevance_with_genai(abstract, keywords):
     Returns:
         bool: True nếu bài báo liên quan, False nếu không.
     """
+    cached = get_llm_cache().get(relevance_cache_key(abstract, keywords))
+    if cached is not None:
+        return cached
+    return bool(_relevance_from_genai(abstract, keywords))
+
+
+# =========================================
+# Gom nhiều abstract vào một prompt
+# =========================================
+RELEVANCE_BATCH_SIZE = 20
+BATCH_TOKEN_BUDGET = 8000  # ước lượng số token đầu vào tối đa mỗi prompt batch
+
+
+def estimate_tokens(text):
+    """Ước lượng thô số token (~4 ký tự / token)."""
+    return len(text) // 4 + 1
+
+
+def split_batches(items, max_items, token_budget=BATCH_TOKEN_BUDGET):
+    """
+    Chia danh sách (id, text) thành các batch theo số phần tử và ngân sách token.
+    Một phần tử vượt ngân sách vẫn được đặt riêng một batch.
+    """
+    batches, current, used = [], [], 0
+    for item_id, text in items:
+        cost = estimate_tokens(text)
+        if current and (len(current) >= max_items or used + cost > token_budget):
+            batches.append(current)
+            current, used = [], 0
+        current.append((item_id, text))
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+def parse_json_response(text):
+    """Parse JSON object từ response của Gemini (bỏ ```json fence nếu có). Lỗi -> None."""
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.strip("`")
+        if text.lower().startswith("json"):
+            text = text[4:]
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def check_relevance_batch_with_genai(batch, keywords):
+    """
+    Phân loại nhiều abstract trong một lần gọi Gemini (JSON keyed theo id).
+
+    Parameters:
+        batch (list): Danh sách (id, abstract).
+        keywords (list): Danh sách từ khóa liên quan đến chủ đề nghiên cứu.
+
+    Returns:
+        dict: {id: bool}. Id nào model trả thiếu / sai định dạng (hoặc cả batch lỗi)
+        sẽ được kiểm tra lại từng bài. Kết quả hợp lệ được ghi vào cache LLM.
+    """
+    abstracts = "\n\n".join(f"[{item_id}]\n{abstract}" for item_id, abstract in batch)
     prompt = f"""
     You are an expert in scientific paper classification.
 
-    Task: Determine whether the following abstract is related to the topic: {", ".join(keywords)}.
-    Answer only with "YES" or "NO".
+    Task: For each abstract below, determine whether it is related to the topic: {", ".join(keywords)}.
+    Return only a JSON object that maps every abstract id to "YES" or "NO",
+    for example {{"0": "YES", "1": "NO"}}.
 
-    Abstract:
-    {abstract}
+    Abstracts:
+    {abstracts}
     """
 
+    answers = None
     try:
-        response = client.models.generate_content(
-            model="gemini-2.5-flash", 
-            contents=prompt,
-            config=GenerateContentConfig(temperature=0)
+        answers = parse_json_response(
+            generate_with_genai(prompt, temperature=0, response_mime_type="application/json")
         )
-        answer = response.text.strip().upper()
-        return "YES" in answer
     except Exception as e:
-        print(f"[Gemini Error - Relevance Check] {e}")
-        return False
+        print(f"[Gemini Error - Batch Relevance Check] {e}")
+
+    cache = get_llm_cache()
+    verdicts = {}
+    for item_id, abstract in batch:
+        answer = str((answers or {}).get(str(item_id), "")).strip().upper()
+        if answer in ("YES", "NO"):
+            verdicts[item_id] = answer == "YES"
+            cache.set(relevance_cache_key(abstract, keywords), verdicts[item_id])
+        else:
+            verdicts[item_id] = bool(_relevance_from_genai(abstract, keywords))
+    return verdicts
 
 
 # =========================================
 # Hàm lọc bài báo không có abstract hoặc không liên quan
 # =========================================
-def filter_irrelevant_papers(results, threshold=0.7, keywords=["Non-Destructive Testing"]):
+def filter_irrelevant_papers(results, threshold=ACCEPT_AT, keywords=["Non-Destructive Testing"],
+                             batch_size=RELEVANCE_BATCH_SIZE, reject_below=REJECT_BELOW):
     """
     Lọc các bài báo không có abstract hoặc không liên quan đến nghiên cứu.
 
     Parameters:
         results (list): Danh sách bài báo, mỗi bài báo là dict với 'abstract' và 'title'.
-        threshold (float): Ngưỡng liên quan tối thiểu (để mở rộng, prompt tự quyết định).
+        threshold (float): Điểm prefilter cục bộ (0-1) từ đó bài được giữ luôn, không hỏi Gemini.
         keywords (list): Danh sách từ khóa liên quan đến chủ đề nghiên cứu.
+        batch_size (int): Số abstract tối đa mỗi lần gọi Gemini (1 = gọi từng bài).
+        reject_below (float): Điểm prefilter dưới mức này bị loại luôn, không hỏi Gemini
+            (chỉ với chủ đề có từ mở rộng trong TOPIC_EXPANSIONS, xem is_calibrated).
 
     Returns:
         list: Danh sách bài báo đã lọc.
     """
-    filtered_papers = []
-
-    for paper in results:
-        title = paper.get("title", "Untitled")
-        abstract = paper.get("abstract", "").strip()
+    candidates = []
+    for idx, paper in enumerate(results):
+        abstract = (paper.get("abstract") or "").strip()
 
         # Bỏ qua nếu không có abstract
         if not abstract or abstract.lower() == "not available":
             continue
+        candidates.append((str(idx), abstract))
+
+    # Prefilter cục bộ (BM25 trên CPU): chắc chắn liên quan / chắc chắn không -> khỏi gọi Gemini
+    verdicts = {}
+    texts = [f"{results[int(item_id)].get('title') or ''} {abstract}" for item_id, abstract in candidates]
+    accepted, rejected, uncertain, _ = split_by_relevance(texts, keywords, threshold, reject_below)
+    for i in accepted:
+        verdicts[candidates[i][0]] = True
+    for i in rejected:
+        verdicts[candidates[i][0]] = False
+    print(f"🧮 Prefilter: {len(accepted)} giữ, {len(rejected)} loại, {len(uncertain)} cần Gemini")
+
+    # Tra cache trước, chỉ gửi Gemini những abstract chưa từng phân loại
+    cache = get_llm_cache()
+    pending = []
+    for item_id, abstract in (candidates[i] for i in uncertain):
+        cached = cache.get(relevance_cache_key(abstract, keywords))
+        if cached is None:
+            pending.append((item_id, abstract))
+        else:
+            verdicts[item_id] = cached
 
-        print(f"Checking relevance for: {title}")
-        is_relevant = check_relevance_with_genai(abstract, keywords, threshold)
+    for batch in split_batches(pending, max(1, batch_size)):
+        print(f"Checking relevance for {len(batch)} papers...")
+        if len(batch) == 1:
+            item_id, abstract = batch[0]
+            verdicts[item_id] = bool(_relevance_from_genai(abstract, keywords))
+        else:
+            verdicts.update(check_relevance_batch_with_genai(batch, keywords))
 
-        if is_relevant:
+    filtered_papers = []
+    for item_id, _ in candidates:
+        paper = results[int(item_id)]
+        if verdicts.get(item_id):
             filtered_papers.append(paper)
         else:
-            print(f"❌ Paper '{title}' is not relevant.")
-        time.sleep(16)  
+            print(f"❌ Paper '{paper.get('title', 'Untitled')}' is not relevant.")
+
+    print(f"⏱️ Gemini rate limit: {get_rate_limit_stats().get('gemini')}")
+    print(f"🗃️ LLM cache: {cache.stats()}")
     return filtered_papers
 
 
+# =========================================
+# Phân loại một bài theo nhiều chủ đề (batch mode nhiều topic)
+# =========================================
+def topic_keywords(topic):
+    return topic.get("keywords") or [topic["name"]]
+
+
+def classify_topics_batch_with_genai(batch, topics, undecided=None):
+    """
+    Phân loại nhiều abstract theo nhiều chủ đề trong một lần gọi Gemini.
+
+    Parameters:
+        batch (list): Danh sách (id, abstract).
+        topics (list): Danh sách topic (dict có "name" và tùy chọn "keywords").
+        undecided (dict): {id: [chỉ số topic]} - chỉ hỏi các topic này cho từng bài
+            (None = mọi topic).
+
+    Returns:
+        dict: {id: {tên topic: bool}} chỉ gồm các topic đã hỏi. Bài model trả thiếu / sai
+        định dạng được kiểm tra lại riêng bằng prompt một chủ đề, chỉ với topic đã hỏi.
+        Mọi kết quả được ghi cache LLM theo khóa của filter_irrelevant_papers nên dùng
+        chung cache với chế độ một chủ đề.
+    """
+    asked = {item_id: (undecided or {}).get(item_id, range(len(topics))) for item_id, _ in batch}
+    used = sorted({i for indices in asked.values() for i in indices})
+    topic_lines = "\n".join(f"T{i}: {', '.join(topic_keywords(topics[i]))}" for i in used)
+    abstracts = "\n\n".join(
+        f"[{item_id}] (topics: {', '.join(f'T{i}' for i in asked[item_id])})\n{abstract}"
+        for item_id, abstract in batch
+    )
+    prompt = f"""
+    You are an expert in scientific paper classification.
+
+    Topics:
+    {topic_lines}
+
+    Task: For each abstract below, list the ids of the topics it is related to (possibly none),
+    considering only the topics listed next to that abstract.
+    Return only a JSON object that maps every abstract id to a list of topic ids,
+    for example {{"0": ["T0", "T2"], "1": []}}.
+
+    Abstracts:
+    {abstracts}
+    """
+
+    answers = None
+    try:
+        answers = parse_json_response(
+            generate_with_genai(prompt, temperature=0, response_mime_type="application/json")
+        )
+    except Exception as e:
+        print(f"[Gemini Error - Topic Classification] {e}")
+
+    cache = get_llm_cache()
+    verdicts = {}
+    for item_id, abstract in batch:
+        answer = (answers or {}).get(str(item_id))
+        verdicts[item_id] = {}
+        for i in asked[item_id]:
+            topic = topics[i]
+            keywords = topic_keywords(topic)
+            if isinstance(answer, list):
+                verdicts[item_id][topic["name"]] = f"T{i}" in {str(a).strip().upper() for a in answer}
+                cache.set(relevance_cache_key(abstract, keywords), verdicts[item_id][topic["name"]])
+            else:
+                verdicts[item_id][topic["name"]] = bool(_relevance_from_genai(abstract, keywords))
+    return verdicts
+
+
+def classify_papers_by_topic(results, topics, threshold=ACCEPT_AT, batch_size=RELEVANCE_BATCH_SIZE,
+                             reject_below=REJECT_BELOW):
+    """
+    Xác định mỗi bài báo liên quan tới những topic nào.
+
+    Với từng topic: prefilter cục bộ giữ / loại các bài chắc chắn, rồi tra cache LLM.
+    Các bài còn cặp (bài, topic) chưa rõ được gửi Gemini một lần cho tất cả topic
+    (mỗi prompt một batch bài), thay vì một lượt gọi cho mỗi topic.
+
+    Parameters:
+        results (list): Danh sách bài báo.
+        topics (list): Danh sách topic (dict có "name" và tùy chọn "keywords").
+        threshold, batch_size, reject_below: như filter_irrelevant_papers.
+
+    Returns:
+        list: Với mỗi bài (cùng thứ tự results), danh sách tên topic liên quan.
+    """
+    candidates = [
+        (str(idx), (paper.get("abstract") or "").strip()) for idx, paper in enumerate(results)
+        if (paper.get("abstract") or "").strip().lower() not in ("", "not available")
+    ]
+    texts = [f"{results[int(item_id)].get('title') or ''} {abstract}" for item_id, abstract in candidates]
+    verdicts = {item_id: {} for item_id, _ in candidates}
+    for topic in topics:
+        accepted, rejected, _, _ = split_by_relevance(texts, topic_keywords(topic), threshold, reject_below)
+        for i in accepted:
+            verdicts[candidates[i][0]][topic["name"]] = True
+        for i in rejected:
+            verdicts[candidates[i][0]][topic["name"]] = False
+
+    cache = get_llm_cache()
+    pending = []
+    undecided = {}
+    for item_id, abstract in candidates:
+        for i, topic in enumerate(topics):
+            if topic["name"] not in verdicts[item_id]:
+                cached = cache.get(relevance_cache_key(abstract, topic_keywords(topic)))
+                if cached is not None:
+                    verdicts[item_id][topic["name"]] = cached
+                else:
+                    undecided.setdefault(item_id, []).append(i)
+        if item_id in undecided:
+            pending.append((item_id, abstract))
+    print(f"🧮 Prefilter + cache: {len(candidates) - len(pending)}/{len(candidates)} bài không cần Gemini, "
+          f"{sum(map(len, undecided.values()))} cặp (bài, topic) cần hỏi")
+
+    for batch in split_batches(pending, max(1, batch_size)):
+        print(f"Classifying {len(batch)} papers against their undecided topics...")
+        for item_id, answers in classify_topics_batch_with_genai(batch, topics, undecided).items():
+            verdicts[item_id].update(answers)
+
+    print(f"⏱️ Gemini rate limit: {get_rate_limit_stats().get('gemini')}")
+    print(f"🗃️ LLM cache: {cache.stats()}")
+    return [
+        [t["name"] for t in topics if verdicts.get(str(idx), {}).get(t["name"])]
+        for idx in range(len(results))
+    ]
+
+
 # =========================================
 # Hàm tóm tắt abstract
 # =========================================
+SUMMARY_PROMPT = """
+    Summarize the following abstract in 3-4 concise sentences.
+    Use simple and clear academic English.
+
+    Abstract:
+    {abstract}
+    """
+
+
+def summary_cache_key(abstract):
+    return make_key("summary", GEMINI_MODEL, SUMMARY_PROMPT, abstract)
+
+
+def _summary_from_genai(abstract):
+    """Gọi Gemini tóm tắt một abstract và ghi cache. Lỗi -> None (không ghi cache)."""
+    try:
+        summary = generate_with_genai(SUMMARY_PROMPT.format(abstract=abstract), temperature=0.3)
+    except Exception as e:
+        print(f"[Gemini Error - Summarization] {e}")
+        return None
+    get_llm_cache().set(summary_cache_key(abstract), summary)
+    return summary
+
+
 def summarize_with_genai(abstract):
     """
     Dùng Gemini API để tóm tắt abstract thành 3-4 câu.
+    Kết quả được tra / lưu trong cache LLM trên đĩa.
 
     Parameters:
         abstract (str): Abstract của bài báo.
@@ -401,47 +866,119 @@ def summarize_with_genai(abstract):
     Returns:
         str: Tóm tắt abstract.
     """
+    cached = get_llm_cache().get(summary_cache_key(abstract))
+    if cached is not None:
+        return cached
+    return _summary_from_genai(abstract) or "Tóm tắt không thành công"
+
+
+# =========================================
+# Tóm tắt nhiều abstract trong một lần gọi
+# =========================================
+SUMMARY_BATCH_SIZE = 10
+
+SUMMARY_RESPONSE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "summaries": {
+            "type": "ARRAY",
+            "items": {
+                "type": "OBJECT",
+                "properties": {
+                    "id": {"type": "STRING"},
+                    "summary": {"type": "STRING"}
+                },
+                "required": ["id", "summary"]
+            }
+        }
+    },
+    "required": ["summaries"]
+}
+
+
+def summarize_batch_with_genai(batch):
+    """
+    Tóm tắt nhiều abstract trong một lần gọi Gemini với JSON response schema.
+
+    Parameters:
+        batch (list): Danh sách (id, abstract).
+
+    Returns:
+        dict: {id: summary}. Bài nào không có tóm tắt hợp lệ trong response
+        (hoặc cả batch lỗi) sẽ được tóm tắt lại riêng. Kết quả được ghi vào cache LLM.
+    """
+    abstracts = "\n\n".join(f"[{item_id}]\n{abstract}" for item_id, abstract in batch)
     prompt = f"""
-    Summarize the following abstract in 3-4 concise sentences.
+    Summarize each of the following abstracts in 3-4 concise sentences.
     Use simple and clear academic English.
+    Return one summary per abstract id.
 
-    Abstract:
-    {abstract}
+    Abstracts:
+    {abstracts}
     """
 
+    answers = {}
     try:
-        response = client.models.generate_content(
-            model="gemini-2.5-flash",  # Model chất lượng cao
-            contents=prompt,
-            config=GenerateContentConfig(temperature=0.3)
-        )
-        return response.text.strip()
+        data = parse_json_response(generate_with_genai(
+            prompt,
+            temperature=0.3,
+            response_mime_type="application/json",
+            response_schema=SUMMARY_RESPONSE_SCHEMA
+        ))
+        for item in (data or {}).get("summaries", []):
+            if isinstance(item, dict) and isinstance(item.get("summary"), str):
+                answers[str(item.get("id"))] = item["summary"].strip()
     except Exception as e:
-        print(f"[Gemini Error - Summarization] {e}")
-        return "Tóm tắt không thành công"
+        print(f"[Gemini Error - Batch Summarization] {e}")
+
+    cache = get_llm_cache()
+    summaries = {}
+    for item_id, abstract in batch:
+        summary = answers.get(str(item_id))
+        if summary:
+            cache.set(summary_cache_key(abstract), summary)
+        else:
+            summary = _summary_from_genai(abstract) or "Tóm tắt không thành công"
+        summaries[item_id] = summary
+    return summaries
 
 
 # =========================================
 # Hàm tóm tắt toàn bộ danh sách bài đã lọc
 # =========================================
-def summarize_filtered_papers(filtered_papers):
+def summarize_filtered_papers(filtered_papers, batch_size=SUMMARY_BATCH_SIZE):
     """
     Tóm tắt abstract của tất cả các bài báo đã lọc.
 
     Parameters:
         filtered_papers (list): Danh sách bài báo đã lọc, mỗi bài chứa 'abstract' và 'title'.
+        batch_size (int): Số abstract tối đa mỗi lần gọi Gemini (1 = gọi từng bài).
 
     Returns:
         list: Danh sách bài báo với key 'summary' chứa tóm tắt abstract.
     """
-    for paper in filtered_papers:
-        abstract = paper.get("abstract", "").strip()
-        title = paper.get("title", "Untitled")
-        
-        if abstract:
-            print(f"Summarizing abstract for: {title}")
-            paper["summary"] = summarize_with_genai(abstract)
-            time.sleep(16)  
+    cache = get_llm_cache()
+    pending = []
+    for idx, paper in enumerate(filtered_papers):
+        abstract = (paper.get("abstract") or "").strip()
+        if not abstract:
+            continue
+        cached = cache.get(summary_cache_key(abstract))
+        if cached is None:
+            pending.append((str(idx), abstract))
+        else:
+            paper["summary"] = cached
 
-    return filtered_papers
+    for batch in split_batches(pending, max(1, batch_size)):
+        print(f"Summarizing abstracts for {len(batch)} papers...")
+        if len(batch) == 1:
+            item_id, abstract = batch[0]
+            summaries = {item_id: _summary_from_genai(abstract) or "Tóm tắt không thành công"}
+        else:
+            summaries = summarize_batch_with_genai(batch)
+        for item_id, summary in summaries.items():
+            filtered_papers[int(item_id)]["summary"] = summary
 
+    print(f"⏱️ Gemini rate limit: {get_rate_limit_stats().get('gemini')}")
+    print(f"🗃️ LLM cache: {cache.stats()}")
+    return filtered_papers
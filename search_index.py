@@ -0,0 +1,191 @@
+import glob
+import json
+import os
+import re
+import threading
+import time
+
+from cache import CACHE_DIR, connect
+from paper_store import paper_keys
+
+SEARCH_INDEX_FILE = "search_index.sqlite"
+# Trọng số BM25 theo cột: title, abstract, summary, authors
+COLUMN_WEIGHTS = (10.0, 1.0, 2.0, 5.0)
+INDEXED_FIELDS = ("title", "abstract", "summary", "authors", "link", "source", "pub_date")
+
+
+def build_match_query(text):
+    """
+    Chuyển chuỗi người dùng nhập thành truy vấn FTS5 an toàn: mỗi từ được đặt trong
+    dấu nháy (không bị hiểu thành toán tử), từ cuối cho phép khớp tiền tố.
+    """
+    tokens = re.findall(r"\w+", text or "")
+    if not tokens:
+        return ""
+    terms = [f'"{t}"' for t in tokens[:-1]] + [f'"{tokens[-1]}"*']
+    return " ".join(terms)
+
+
+class SearchIndex:
+    """
+    Chỉ mục toàn văn (SQLite FTS5, BM25) trên title / abstract / summary / authors
+    của mọi bài báo trong results/.
+
+    File .jsonl chỉ được append nên mỗi file lưu lại byte offset đã index; lần sync
+    sau chỉ đọc phần mới thêm. File .json cũ được index lại khi mtime thay đổi.
+    """
+
+    def __init__(self, path=os.path.join(CACHE_DIR, SEARCH_INDEX_FILE)):
+        self._lock = threading.Lock()
+        self._conn = connect(path)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS papers (
+                id INTEGER PRIMARY KEY,
+                key TEXT NOT NULL UNIQUE,
+                file TEXT NOT NULL,
+                title TEXT, abstract TEXT, summary TEXT, authors TEXT,
+                link TEXT, source TEXT, pub_date TEXT
+            );
+            CREATE VIRTUAL TABLE IF NOT EXISTS papers_fts USING fts5(
+                title, abstract, summary, authors,
+                content='papers', content_rowid='id',
+                tokenize='porter unicode61 remove_diacritics 2'
+            );
+            CREATE TRIGGER IF NOT EXISTS papers_ai AFTER INSERT ON papers BEGIN
+                INSERT INTO papers_fts(rowid, title, abstract, summary, authors)
+                VALUES (new.id, new.title, new.abstract, new.summary, new.authors);
+            END;
+            CREATE TRIGGER IF NOT EXISTS papers_au AFTER UPDATE ON papers BEGIN
+                INSERT INTO papers_fts(papers_fts, rowid, title, abstract, summary, authors)
+                VALUES ('delete', old.id, old.title, old.abstract, old.summary, old.authors);
+                INSERT INTO papers_fts(rowid, title, abstract, summary, authors)
+                VALUES (new.id, new.title, new.abstract, new.summary, new.authors);
+            END;
+            CREATE TABLE IF NOT EXISTS indexed_files (
+                path TEXT PRIMARY KEY, offset INTEGER NOT NULL, mtime REAL NOT NULL
+            );
+            """
+        )
+        self._conn.commit()
+
+    # ---------- ghi ----------
+    def add_papers(self, papers, file=""):
+        """Thêm / cập nhật bài báo (khóa theo DOI, link hoặc title đã chuẩn hóa). Trả về số bài."""
+        rows = []
+        for paper in papers:
+            key = next((k for k in paper_keys(paper) if k), "")
+            if key:
+                rows.append((key, file, *(str(paper.get(field) or "") for field in INDEXED_FIELDS)))
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO papers (key, file, title, abstract, summary, authors, link, source, pub_date)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT(key) DO UPDATE SET file = excluded.file, title = excluded.title,"
+                " abstract = excluded.abstract, summary = excluded.summary, authors = excluded.authors,"
+                " link = excluded.link, source = excluded.source, pub_date = excluded.pub_date",
+                rows
+            )
+        return len(rows)
+
+    def sync_file(self, path):
+        """Index phần chưa index của một file kết quả. Trả về số bài đã thêm."""
+        if not os.path.exists(path):
+            return 0
+        mtime = os.path.getmtime(path)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT offset, mtime FROM indexed_files WHERE path = ?", (path,)
+            ).fetchone()
+        offset, indexed_mtime = row or (0, 0.0)
+        size = os.path.getsize(path)
+        jsonl = path.endswith(".jsonl")
+        if (jsonl and offset == size) or (not jsonl and indexed_mtime == mtime):
+            return 0
+        if jsonl and offset > size:  # file bị ghi lại từ đầu
+            offset = 0
+
+        papers = []
+        with open(path, "rb") as f:
+            if jsonl:
+                f.seek(offset)
+                for line in f:
+                    if not line.endswith(b"\n"):  # dòng đang ghi dở -> để lần sau
+                        break
+                    offset += len(line)
+                    try:
+                        papers.append(json.loads(line))
+                    except ValueError:
+                        continue
+            else:
+                try:
+                    papers = json.load(f)
+                except ValueError:
+                    papers = []
+                offset = size
+
+        count = self.add_papers(papers, file=os.path.basename(path))
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO indexed_files (path, offset, mtime) VALUES (?, ?, ?)",
+                (path, offset, mtime)
+            )
+        return count
+
+    def sync_dir(self, results_dir="results"):
+        """Index mọi file kết quả mới / mới thay đổi trong thư mục."""
+        files = glob.glob(os.path.join(results_dir, "*.json")) + glob.glob(os.path.join(results_dir, "*.jsonl"))
+        return sum(self.sync_file(path) for path in sorted(files))
+
+    # ---------- truy vấn ----------
+    def search(self, query, limit=20, source=None):
+        """
+        Tìm bài báo theo từ khóa, xếp hạng BM25 (title và authors được ưu tiên).
+
+        Parameters:
+            query (str): Chuỗi tìm kiếm tự do.
+            limit (int): Số kết quả tối đa.
+            source (str): Chỉ lấy bài từ nguồn này (vd: "arXiv"), None = mọi nguồn.
+
+        Returns:
+            tuple: (danh sách kết quả dạng dict có thêm "snippet" và "score", thời gian truy vấn ms).
+        """
+        match = build_match_query(query)
+        if not match:
+            return [], 0.0
+        sql = (
+            "SELECT p.title, p.authors, p.source, p.pub_date, p.link, p.summary, p.file,"
+            " snippet(papers_fts, 1, '**', '**', '…', 16), bm25(papers_fts, ?, ?, ?, ?) AS score"
+            " FROM papers_fts JOIN papers p ON p.id = papers_fts.rowid"
+            " WHERE papers_fts MATCH ?"
+        )
+        params = [*COLUMN_WEIGHTS, match]
+        if source:
+            sql += " AND p.source LIKE ?"
+            params.append(f"%{source}%")
+        sql += " ORDER BY score LIMIT ?"
+        params.append(limit)
+
+        start = time.perf_counter()
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        columns = ("title", "authors", "source", "pub_date", "link", "summary", "file", "snippet", "score")
+        return [dict(zip(columns, row)) for row in rows], elapsed_ms
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM papers").fetchone()[0]
+
+
+_search_index = None
+_search_index_lock = threading.Lock()
+
+
+def get_search_index():
+    """SearchIndex dùng chung cho cả tiến trình."""
+    global _search_index
+    with _search_index_lock:
+        if _search_index is None:
+            _search_index = SearchIndex()
+        return _search_index
@@ -1,12 +1,22 @@
 import os
 import glob
 import json
-from datetime import datetime, timedelta
+from datetime import datetime
+try:
+    import fcntl
+except ImportError:  # Windows: không có flock, ghi append một lần vẫn đủ an toàn cho 1 tiến trình
+    fcntl = None
+from paper_store import PaperStore
+from dedup_index import DedupIndex
+from search_index import get_search_index
 
 RESULTS_DIR = "results"
 RESULTS_DIR_AGENT = "results_agent"
 DATABASE_DIR = "database"
 DATABASE_FILE = "papers_db.json"
+EXPORTS_DIR = "exports"
+RESULTS_EXT = ".jsonl"
+KEYS_EXT = ".keys"
 
 def normalize_key(paper):
     """
@@ -35,7 +45,7 @@ def get_latest_json():
     Lấy file JSON mới nhất theo ngày có dạng: YYYY-MM-DD_allapi_scholar_ndt.json
     """
     pattern = os.path.join(RESULTS_DIR, "*_allapi_scholar_ndt.json")
-    json_files = glob.glob(pattern)
+    json_files = glob.glob(pattern) + glob.glob(pattern + "l")
 
     if not json_files:
         print("⚠️ Không tìm thấy file JSON nào trong thư mục results/")
@@ -66,7 +76,7 @@ def get_latest_json_agent():
     Lấy file JSON mới nhất theo ngày có dạng: YYYY-MM-DD_allapi_scholar_ndt.json
     """
     pattern = os.path.join(RESULTS_DIR_AGENT, "*_allapi_scholar_ndt.json")
-    json_files = glob.glob(pattern)
+    json_files = glob.glob(pattern) + glob.glob(pattern + "l")
 
     if not json_files:
         print("⚠️ Không tìm thấy file JSON nào trong thư mục results_agent/")
@@ -93,57 +103,144 @@ def get_latest_json_agent():
     return latest_file
 
 # ==============================
-# Lưu file JSON với timestamp
+# Đọc / ghi file kết quả JSON Lines
 # ==============================
-def save_results_to_json(data, output_dir=RESULTS_DIR, prefix="allapi_scholar_ndt"):
+def iter_results(path):
     """
-    Lưu kết quả vào file JSON với tên chứa timestamp.
-    Nếu cùng 1 ngày đã có file -> load dữ liệu cũ, merge thêm dữ liệu mới (lọc trùng), rồi ghi đè lại.
+    Đọc lần lượt từng bài báo trong file kết quả mà không nạp cả file.
+    Hỗ trợ .jsonl (mỗi dòng 1 bài) và file .json cũ (mảng JSON).
+    Dòng hỏng (vd: ghi dở khi tiến trình bị kill) được bỏ qua.
     """
-    os.makedirs(output_dir, exist_ok=True)
-    today_str = datetime.now().strftime("%Y-%m-%d")
+    if not path.endswith(RESULTS_EXT):
+        with open(path, "r", encoding="utf-8") as f:
+            yield from json.load(f)
+        return
+
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                print(f"⚠️ Bỏ qua dòng hỏng {line_no} trong {path}")
+
 
-    # Tìm file trong ngày hôm nay
-    existing_file = None
-    for fname in os.listdir(output_dir):
-        if fname.startswith(today_str) and fname.endswith(f"{prefix}.json"):
-            existing_file = os.path.join(output_dir, fname)
-            break
+def _keys_path(path):
+    return path + KEYS_EXT
 
-    merged_data = []
-    if existing_file:
+
+def load_result_keys(path):
+    """
+    Tập key chuẩn hóa của file kết quả, đọc từ file index phụ (<file>.keys).
+    Index thiếu hoặc cũ hơn file dữ liệu thì dựng lại từ dữ liệu.
+    """
+    if not os.path.exists(path):
+        return set()
+    keys_path = _keys_path(path)
+    if os.path.exists(keys_path) and os.path.getmtime(keys_path) >= os.path.getmtime(path):
+        with open(keys_path, "r", encoding="utf-8") as f:
+            return {line.rstrip("\n") for line in f if line.strip()}
+
+    keys = {normalize_key(p) for p in iter_results(path)}
+    keys.discard("")
+    if path.endswith(RESULTS_EXT):
+        with open(keys_path, "w", encoding="utf-8") as f:
+            f.writelines(f"{key}\n" for key in sorted(keys))
+    return keys
+
+
+def _append_locked(path, text):
+    """
+    Append text bằng một lần write (kèm flock nếu có) rồi fsync.
+    Nếu lần ghi trước bị dừng giữa dòng thì xuống dòng trước để không dính vào dòng hỏng.
+    """
+    with open(path, "a+b") as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
         try:
-            with open(existing_file, "r", encoding="utf-8") as f:
-                old_data = json.load(f)
-        except Exception as e:
-            print(f"⚠️ Lỗi khi đọc file cũ {existing_file}: {e}")
-            old_data = []
-        merged_data = old_data
-    else:
-        # Nếu chưa có file -> tạo file mới
-        timestamp = datetime.now().strftime("%Y-%m-%d")
-        filename = f"{timestamp}_{prefix}.json"
-        existing_file = os.path.join(output_dir, filename)
+            data = text.encode("utf-8")
+            f.seek(0, os.SEEK_END)
+            if f.tell() > 0:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    data = b"\n" + data
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        finally:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def append_results(path, papers):
+    """Ghi thêm bài báo vào cuối file .jsonl và cập nhật index key phụ."""
+    if not papers:
+        return
+    _append_locked(path, "".join(json.dumps(p, ensure_ascii=False) + "\n" for p in papers))
+    keys = [normalize_key(p) for p in papers]
+    _append_locked(_keys_path(path), "".join(f"{key}\n" for key in keys if key))
+
+
+def export_pretty_json(path, output_dir=EXPORTS_DIR):
+    """
+    Xuất file kết quả ra JSON dạng mảng, indent=2 (ghi từng bài, không nạp cả file).
+    Trả về đường dẫn file đã xuất.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    base = os.path.splitext(os.path.basename(path))[0]
+    out_path = os.path.join(output_dir, f"{base}.json")
+    with open(out_path, "w", encoding="utf-8") as f:
+        f.write("[")
+        for i, paper in enumerate(iter_results(path)):
+            f.write(",\n  " if i else "\n  ")
+            f.write(json.dumps(paper, ensure_ascii=False, indent=2).replace("\n", "\n  "))
+        f.write("\n]\n")
+    return out_path
+
 
-    # Merge dữ liệu (lọc trùng theo key chuẩn hóa)
-    existing_keys = {normalize_key(item) for item in merged_data if normalize_key(item)}
-    new_filtered = [p for p in data if normalize_key(p) not in existing_keys]
+# ==============================
+# Lưu file kết quả theo ngày
+# ==============================
+def save_results_to_json(data, output_dir=RESULTS_DIR, prefix="allapi_scholar_ndt"):
+    """
+    Lưu kết quả vào file JSON Lines theo ngày: YYYY-MM-DD_<prefix>.jsonl.
+    Nếu cùng 1 ngày đã có file -> chỉ append các bài mới (lọc trùng bằng index key phụ),
+    không đọc lại / ghi đè toàn bộ file. Các bài mới được thêm vào chỉ mục tìm kiếm.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    today_str = datetime.now().strftime("%Y-%m-%d")
+    result_file = os.path.join(output_dir, f"{today_str}_{prefix}{RESULTS_EXT}")
+
+    # Merge dữ liệu (lọc trùng theo key chuẩn hóa, kể cả trùng trong chính data)
+    existing_keys = load_result_keys(result_file)
+    new_filtered = []
+    for p in data:
+        key = normalize_key(p)
+        if key and key in existing_keys:
+            continue
+        existing_keys.add(key)
+        new_filtered.append(p)
 
     if not new_filtered:
         print("⏩ Không có dữ liệu mới để thêm.")
-        return existing_file
-
-    merged_data.extend(new_filtered)
+        return result_file if os.path.exists(result_file) else None
 
     try:
-        with open(existing_file, "w", encoding="utf-8") as f:
-            json.dump(merged_data, f, ensure_ascii=False, indent=2)
-        print(f"💾 Đã cập nhật file: {existing_file} (thêm {len(new_filtered)} bài báo)")
-        return existing_file
+        append_results(result_file, new_filtered)
+        print(f"💾 Đã cập nhật file: {result_file} (thêm {len(new_filtered)} bài báo)")
     except Exception as e:
         print(f"❌ Lỗi khi lưu file JSON: {e}")
         return None
 
+    # Cập nhật chỉ mục tìm kiếm (chỉ đọc phần vừa append)
+    try:
+        get_search_index().sync_file(result_file)
+    except Exception as e:
+        print(f"⚠️ Không cập nhật được chỉ mục tìm kiếm: {e}")
+    return result_file
+
 
 # ==============================
 # Load Database DOI
@@ -172,35 +269,27 @@ def save_database(data, db_dir=DATABASE_DIR, db_file=DATABASE_FILE):
 # ==============================
 def save_results_to_database(result_file, db_dir=DATABASE_DIR, db_file=DATABASE_FILE):
     """
-    Đọc kết quả từ file JSON và lưu vào database.
-    Chuẩn hóa key (doi/link/title) và loại bỏ trùng lặp.
+    Đọc kết quả từ file JSON và upsert vào database SQLite (paper_store).
+    Chuẩn hóa key (doi/link/title) và loại bỏ trùng lặp bằng unique index,
+    không đọc/ghi lại toàn bộ database. db_file là database JSON cũ,
+    chỉ dùng cho lần chuyển đổi đầu tiên.
+    Dedup index (Bloom filter) được cập nhật dần với các key vừa lưu.
     """
     if not os.path.exists(result_file):
         print(f"❌ File kết quả không tồn tại: {result_file}")
         return False
 
     try:
-        with open(result_file, "r", encoding="utf-8") as f:
-            results = json.load(f)
+        with PaperStore(db_dir, legacy_file=db_file) as store:
+            index = DedupIndex(store)
+            new_count = store.upsert_many(iter_results(result_file))
+            index.add_papers(iter_results(result_file))
+            index.save()
+            total = len(store)
     except Exception as e:
         print(f"❌ Lỗi khi đọc file kết quả {result_file}: {e}")
         return False
-
-    db_data = load_database(db_dir, db_file)
-    db_dict = {normalize_key(item): item for item in db_data if normalize_key(item)}
-
-    new_count = 0
-    for paper in results:
-        key = normalize_key(paper)
-        if key and key not in db_dict:
-            db_dict[key] = {
-                "title": paper.get("title", "Untitled"),
-                "doi": paper.get("doi", paper.get("link", ""))
-            }
-            new_count += 1
-
-    save_database(list(db_dict.values()), db_dir, db_file)
-    print(f"✅ Đã thêm {new_count} bài báo mới vào database từ {result_file}")
+    print(f"✅ Đã thêm {new_count} bài báo mới vào database từ {result_file} (tổng {total})")
     return True
 
 
@@ -210,58 +299,19 @@ def save_results_to_database(result_file, db_dir=DATABASE_DIR, db_file=DATABASE_
 # ==============================
 def filter_duplicates(new_results, results_dir=RESULTS_DIR, db_dir=DATABASE_DIR, db_file=DATABASE_FILE):
     """
-    Lọc trùng các bài báo mới bằng key chuẩn hóa (doi/link/title).
-    - Nếu file mới nhất là hôm nay → không lọc.
-    - Nếu file mới nhất là hôm qua → lọc theo hôm qua.
-    - Nếu không phải hôm nay và không phải hôm qua → lọc theo database.
+    Lọc trùng các bài báo mới với toàn bộ bài đã lưu (key chuẩn hóa doi/link/title).
+    Mỗi bài chỉ tốn O(1) tra Bloom filter (dedup_index); chỉ khi filter báo
+    "có thể trùng" mới truy vấn database để xác nhận.
+    results_dir được giữ để tương thích, không còn dùng.
     """
-    today_str = datetime.now().strftime("%Y-%m-%d")
-    yesterday_str = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
-
-    # 🔹 Lấy file JSON mới nhất
-    latest_file = get_latest_json()
-    if not latest_file:
-        return new_results
-
-    # 🔹 Đọc dữ liệu file mới nhất
-    try:
-        with open(latest_file, "r", encoding="utf-8") as f:
-            old_results = json.load(f)
-    except Exception as e:
-        print(f"❌ Lỗi khi đọc file {latest_file}: {e}")
-        return new_results
-
-    old_dates = {paper.get("pub_date", "") for paper in old_results}
-
-    # ✅ File hôm nay → không lọc
-    if today_str in old_dates:
-        print("⏩ File mới nhất đã là hôm nay -> Không lọc trùng.")
-        return new_results
-
-    # ✅ Không phải hôm nay → lọc
-    # Nếu là hôm qua → lọc theo hôm qua
-    if yesterday_str in old_dates:
-        old_keys = {normalize_key(p) for p in old_results if normalize_key(p)}
-        filtered_results = [p for p in new_results if normalize_key(p) not in old_keys]
-        removed_count = len(new_results) - len(filtered_results)
-        print(f"🗑️ Đã loại bỏ {removed_count} bài báo trùng với hôm qua.")
-        return filtered_results
-
-    # ✅ Không phải hôm qua → lọc theo database
-    db_path = os.path.join(db_dir, db_file)
-    if not os.path.exists(db_path):
-        print("⚠️ Không tìm thấy database -> Trả về toàn bộ dữ liệu mới.")
-        return new_results
-
-    try:
-        with open(db_path, "r", encoding="utf-8") as f:
-            db_data = json.load(f)
-            db_keys = {normalize_key(item) for item in db_data if normalize_key(item)}
-    except Exception as e:
-        print(f"❌ Lỗi khi đọc database {db_path}: {e}")
-        return new_results
+    with PaperStore(db_dir, legacy_file=db_file) as store:
+        if not len(store):
+            print("⚠️ Database trống -> Trả về toàn bộ dữ liệu mới.")
+            return new_results
+        index = DedupIndex(store)
+        filtered_results = [p for p in new_results if not index.contains(p)]
 
-    filtered_results = [p for p in new_results if normalize_key(p) not in db_keys]
     removed_count = len(new_results) - len(filtered_results)
-    print(f"🗑️ Đã loại bỏ {removed_count} bài báo trùng với database.")
+    print(f"🗑️ Đã loại bỏ {removed_count} bài báo trùng với database "
+          f"(Bloom false positive: {index.false_positives}).")
     return filtered_results
@@ -0,0 +1,87 @@
+import json
+import os
+import threading
+from datetime import datetime, timezone
+
+WATERMARKS_DIR = "database"
+WATERMARKS_FILE = "watermarks.json"
+
+
+class Watermarks:
+    """
+    High-water mark theo nguồn + truy vấn, lưu ở database/watermarks.json:
+    {source: {query: {"since": "YYYY-MM-DD", "updated_at": "..."}}}
+
+    "since" là ngày (UTC) bắt đầu lần chạy thành công trước (hoặc ngày cũ nhất đã thấy nếu kết
+    quả bị cắt); lần sau chỉ hỏi các bài được tạo / index / nộp từ ngày đó (lấy trùng một ngày,
+    phần trùng do bước lọc trùng xử lý).
+    Nguồn lỗi không được dời mark. Nguồn bị cắt ở giới hạn số bài (kết quả sắp mới nhất
+    trước) chỉ chứng minh đã thấy hết bài tới ngày cũ nhất được trả về, nên mark dời tới
+    ngày đó (tính cả ngày đó) thay vì tới ngày bắt đầu chạy.
+    Mark chỉ được ghi ra file khi commit() - gọi sau khi kết quả đã lưu xong, để run bị
+    dừng giữa chừng không làm mất bài.
+    """
+
+    def __init__(self, db_dir=WATERMARKS_DIR, db_file=WATERMARKS_FILE):
+        self.path = os.path.join(db_dir, db_file)
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._marks = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._marks = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Không đọc được {self.path}: {e} -> truy vấn đầy đủ")
+
+    def since(self, source, query):
+        """Ngày (YYYY-MM-DD) từ đó cần hỏi lại nguồn, hoặc None (truy vấn đầy đủ)."""
+        with self._lock:
+            return self._marks.get(source, {}).get(query, {}).get("since")
+
+    def mark(self, source, query, started_at, count, limit=None, oldest=None):
+        """
+        Ghi nhận nguồn đã tìm kiếm thành công trong lần chạy bắt đầu lúc started_at (datetime UTC).
+
+        Parameters:
+            count (int): Số bài nguồn trả về.
+            limit (int): Giới hạn số bài của lần tìm kiếm; count >= limit nghĩa là kết quả
+                bị cắt (None = không giới hạn).
+            oldest (str): Ngày (YYYY-MM-DD) của bài cũ nhất được trả về, theo trục sắp xếp
+                của nguồn. Kết quả bị cắt thì mark dời tới ngày này; không có thì giữ mark cũ.
+
+        Returns:
+            bool: True nếu mark được dời.
+        """
+        since = started_at.strftime("%Y-%m-%d")
+        if limit is not None and count >= limit:
+            if not oldest:
+                print(f"🔖 {source} / {query}: chạm giới hạn {limit} bài -> giữ high-water mark cũ")
+                return False
+            since = min(since, oldest[:10])
+            print(f"🔖 {source} / {query}: chạm giới hạn {limit} bài -> high-water mark = {since}")
+        with self._lock:
+            self._pending.setdefault(source, {})[query] = {
+                "since": since,
+                "updated_at": started_at.isoformat(timespec="seconds"),
+            }
+        return True
+
+    def commit(self):
+        """Ghi các mark đang chờ ra file (ghi file tạm rồi os.replace)."""
+        with self._lock:
+            if not self._pending:
+                return
+            for source, queries in self._pending.items():
+                self._marks.setdefault(source, {}).update(queries)
+            self._pending = {}
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._marks, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+        print(f"🔖 Đã cập nhật high-water mark: {self.path}")
+
+
+def utc_now():
+    return datetime.now(timezone.utc)